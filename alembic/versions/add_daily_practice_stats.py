@@ -0,0 +1,37 @@
+"""Per-user daily practice rollups
+
+The table starts empty; fill it with scripts/backfill_daily_practice_stats.py
+after upgrading.
+
+Revision ID: add_daily_practice_stats
+Revises: add_morning_context_summary
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_daily_practice_stats'
+down_revision: Union[str, Sequence[str], None] = 'add_morning_context_summary'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_practice_stats',
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('local_date', sa.Date(), nullable=False),
+        sa.Column('sit_minutes', sa.Integer(), nullable=False),
+        sa.Column('sit_count', sa.Integer(), nullable=False),
+        sa.Column('checkin_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'local_date'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_practice_stats')
@@ -0,0 +1,33 @@
+"""Device tokens: per-token APNs delivery health
+
+Revision ID: add_device_token_health
+Revises: add_scheduled_checkins
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_device_token_health'
+down_revision: Union[str, Sequence[str], None] = 'add_scheduled_checkins'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('device_tokens', sa.Column('last_success_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('device_tokens', sa.Column('last_failure_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('device_tokens', sa.Column('last_failure_reason', sa.String(), nullable=True))
+    op.add_column('device_tokens', sa.Column('failure_count', sa.Integer(), nullable=False,
+                                             server_default='0'))
+    op.add_column('device_tokens', sa.Column('disabled_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('device_tokens', 'disabled_at')
+    op.drop_column('device_tokens', 'failure_count')
+    op.drop_column('device_tokens', 'last_failure_reason')
+    op.drop_column('device_tokens', 'last_failure_at')
+    op.drop_column('device_tokens', 'last_success_at')
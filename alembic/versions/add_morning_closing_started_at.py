@@ -0,0 +1,24 @@
+"""Closing-turn claim on morning_sessions
+
+Revision ID: add_morning_closing_started_at
+Revises: add_daily_practice_stats
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_morning_closing_started_at'
+down_revision: Union[str, Sequence[str], None] = 'add_daily_practice_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('morning_sessions', sa.Column('closing_started_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('morning_sessions', 'closing_started_at')
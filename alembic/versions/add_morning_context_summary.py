@@ -0,0 +1,26 @@
+"""Rolling context summary on morning_sessions
+
+Revision ID: add_morning_context_summary
+Revises: add_morning_sessions_user_index
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_morning_context_summary'
+down_revision: Union[str, Sequence[str], None] = 'add_morning_sessions_user_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('morning_sessions', sa.Column('context_summary', sa.Text(), nullable=True))
+    op.add_column('morning_sessions', sa.Column('context_summary_through', sa.Uuid(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('morning_sessions', 'context_summary_through')
+    op.drop_column('morning_sessions', 'context_summary')
@@ -0,0 +1,23 @@
+"""(user_id, created_at) index on morning_sessions for keyset pagination
+
+Revision ID: add_morning_sessions_user_index
+Revises: add_morning_turn_events
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'add_morning_sessions_user_index'
+down_revision: Union[str, Sequence[str], None] = 'add_morning_turn_events'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_morning_sessions_user_id_created_at', 'morning_sessions', ['user_id', 'created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_morning_sessions_user_id_created_at', table_name='morning_sessions')
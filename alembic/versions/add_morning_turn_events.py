@@ -0,0 +1,35 @@
+"""Spilled morning turn events, for resumable chat streams
+
+Revision ID: add_morning_turn_events
+Revises: add_notebooklm_answers
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = 'add_morning_turn_events'
+down_revision: Union[str, Sequence[str], None] = 'add_notebooklm_answers'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'morning_turn_events',
+        sa.Column('turn_id', sa.Uuid(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('session_id', sa.Uuid(), nullable=False),
+        sa.Column('event', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('turn_id', 'seq'),
+        sa.ForeignKeyConstraint(['session_id'], ['morning_sessions.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_morning_turn_events_created_at', 'morning_turn_events', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('morning_turn_events')
@@ -0,0 +1,34 @@
+"""Persistent cache of NotebookLM answers
+
+Revision ID: add_notebooklm_answers
+Revises: add_time_range_indexes
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_notebooklm_answers'
+down_revision: Union[str, Sequence[str], None] = 'add_time_range_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notebooklm_answers',
+        sa.Column('normalized_question', sa.Text(), nullable=False),
+        sa.Column('question', sa.Text(), nullable=False),
+        sa.Column('answer', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('normalized_question'),
+    )
+    op.create_index('ix_notebooklm_answers_last_used_at', 'notebooklm_answers', ['last_used_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('notebooklm_answers')
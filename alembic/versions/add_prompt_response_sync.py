@@ -0,0 +1,43 @@
+"""Incremental sync: updated_at on sits/checkins, deletion tombstones
+
+Revision ID: add_prompt_response_sync
+Revises: add_device_token_health
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_prompt_response_sync'
+down_revision: Union[str, Sequence[str], None] = 'add_device_token_health'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    for table in ('sits', 'checkins'):
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False,
+                                       server_default=sa.func.now()))
+        op.execute(f"UPDATE {table} SET updated_at = created_at")
+        op.create_index(f'ix_{table}_user_id_updated_at', table, ['user_id', 'updated_at'])
+
+    op.create_table(
+        'deleted_prompt_responses',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_deleted_prompt_responses_user_id_deleted_at', 'deleted_prompt_responses',
+                    ['user_id', 'deleted_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('deleted_prompt_responses')
+    for table in ('sits', 'checkins'):
+        op.drop_index(f'ix_{table}_user_id_updated_at', table_name=table)
+        op.drop_column(table, 'updated_at')
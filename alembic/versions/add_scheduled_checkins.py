@@ -0,0 +1,41 @@
+"""Add scheduled_checkins and users.timezone for the server-side scheduler
+
+Revision ID: add_scheduled_checkins
+Revises: add_transcription_jobs
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_scheduled_checkins'
+down_revision: Union[str, Sequence[str], None] = 'add_transcription_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('timezone', sa.String(), nullable=True))
+    op.create_table(
+        'scheduled_checkins',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('user_id', sa.Uuid(), nullable=False),
+        sa.Column('local_date', sa.Date(), nullable=False),
+        sa.Column('slot', sa.Integer(), nullable=False),
+        sa.Column('fire_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.UniqueConstraint('user_id', 'local_date', 'slot', name='uq_scheduled_checkins_user_date_slot'),
+    )
+    op.create_index('ix_scheduled_checkins_status_fire_at', 'scheduled_checkins', ['status', 'fire_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('scheduled_checkins')
+    op.drop_column('users', 'timezone')
@@ -0,0 +1,46 @@
+"""Composite (owner, time) indexes for time-window queries
+
+Every range query filters on the owning id plus a timestamp, which the
+single-column owner indexes can only half-serve (fetch all the user's rows, then
+filter and sort). The composite indexes turn them into index range scans and
+make the single-column ones redundant, so those are dropped.
+
+Built CONCURRENTLY so production writes aren't blocked while they build.
+
+Revision ID: add_time_range_indexes
+Revises: add_prompt_response_sync
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = 'add_time_range_indexes'
+down_revision: Union[str, Sequence[str], None] = 'add_prompt_response_sync'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (new composite index, table, columns, single-column index it supersedes)
+INDEXES = [
+    ('ix_sits_user_id_started_at', 'sits', ['user_id', 'started_at'], 'ix_sits_user_id'),
+    ('ix_checkins_user_id_responded_at', 'checkins', ['user_id', 'responded_at'], 'ix_checkins_user_id'),
+    ('ix_morning_messages_session_id_created_at', 'morning_messages', ['session_id', 'created_at'],
+     'ix_morning_messages_session_id'),
+    ('ix_chat_messages_user_id_created_at', 'chat_messages', ['user_id', 'created_at'],
+     'ix_chat_messages_user_id'),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, superseded in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(superseded, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, superseded in INDEXES:
+            op.create_index(superseded, table, columns[:1], postgresql_concurrently=True, if_not_exists=True)
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""Add transcription_jobs queue
+
+Revision ID: add_transcription_jobs
+Revises: add_sit_time_known
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = 'add_transcription_jobs'
+down_revision: Union[str, Sequence[str], None] = 'add_sit_time_known'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'transcription_jobs',
+        sa.Column('id', sa.Uuid(), nullable=False),
+        sa.Column('checkin_id', sa.Uuid(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.ForeignKeyConstraint(['checkin_id'], ['checkins.id'], ondelete='CASCADE'),
+    )
+    op.create_index('ix_transcription_jobs_checkin_id', 'transcription_jobs', ['checkin_id'])
+    # The worker's claim query: runnable jobs in due order.
+    op.create_index('ix_transcription_jobs_status_next_attempt_at', 'transcription_jobs',
+                    ['status', 'next_attempt_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('transcription_jobs')
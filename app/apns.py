@@ -5,84 +5,274 @@ Requires env vars:
   APNS_TEAM_ID      — 10-char team ID (e.g. JGB9FCMU22)
   APNS_AUTH_KEY_PATH — Path to the .p8 file (e.g. /opt/sit/AuthKey_G2X3SPLGVU.p8)
   APNS_PRODUCTION   — Set to "true" for production APNs, omit for sandbox/development
+Optional:
+  APNS_HOST         — Override the APNs origin (e.g. a local fake server for testing)
+  APNS_MAX_CONCURRENCY — Max in-flight pushes per fan-out (default 50)
+
+One APNsClient lives for the life of the process: the .p8 key is parsed once, the
+provider JWT is reused for TOKEN_TTL (Apple rejects tokens older than an hour and
+throttles re-signing more often than every 20 minutes), and all pushes share one
+multiplexed HTTP/2 connection.
 """
+import asyncio
+import json
+import logging
 import os
 import time
-import json
-import jwt
+from datetime import datetime, timezone
+from typing import Optional
+
 import httpx
+import jwt
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import DeviceToken
+
+logger = logging.getLogger(__name__)
 
 APNS_KEY_ID = os.getenv("APNS_KEY_ID")
 APNS_TEAM_ID = os.getenv("APNS_TEAM_ID", "JGB9FCMU22")
 APNS_AUTH_KEY_PATH = os.getenv("APNS_AUTH_KEY_PATH")
 APNS_PRODUCTION = os.getenv("APNS_PRODUCTION", "").lower() == "true"
+APNS_MAX_CONCURRENCY = int(os.getenv("APNS_MAX_CONCURRENCY", "50"))
 
 WATCH_BUNDLE_ID = "com.jasonbenn.sit.watchkitapp"
 
-APNS_HOST = (
+APNS_HOST = os.getenv("APNS_HOST") or (
     "https://api.push.apple.com"
     if APNS_PRODUCTION
     else "https://api.sandbox.push.apple.com"
 )
 
+TOKEN_TTL = 50 * 60
 
-def _load_auth_key() -> str:
-    if APNS_AUTH_KEY_PATH:
-        with open(APNS_AUTH_KEY_PATH) as f:
-            return f.read()
-    raise RuntimeError("APNS_AUTH_KEY_PATH not set")
+# APNs reasons meaning the token itself will never work again: delete it.
+DEAD_TOKEN_REASONS = {"BadDeviceToken", "Unregistered", "ExpiredToken"}
+# Token is valid but belongs to another app/environment: keep it, stop sending.
+DISABLE_TOKEN_REASONS = {"DeviceTokenNotForTopic", "TopicDisallowed"}
+# Our credentials, not the token: these never count against a device.
+PROVIDER_ERROR_REASONS = {
+    "InvalidProviderToken", "ExpiredProviderToken", "MissingProviderToken",
+    "BadCertificate", "BadCertificateEnvironment", "Forbidden",
+}
+# Consecutive token-specific rejections after which a token is skipped until re-registered.
+MAX_CONSECUTIVE_FAILURES = int(os.getenv("APNS_MAX_CONSECUTIVE_FAILURES", "5"))
 
 
-def _make_jwt() -> str:
-    """Create a signed JWT for APNs authentication. Valid for 1 hour."""
-    payload = {
-        "iss": APNS_TEAM_ID,
-        "iat": int(time.time()),
-    }
-    return jwt.encode(
-        payload,
-        _load_auth_key(),
-        algorithm="ES256",
-        headers={"kid": APNS_KEY_ID},
-    )
+class APNsError(Exception):
+    """An APNs error response, with Apple's reason string
+    (https://developer.apple.com/documentation/usernotifications/handling-notification-responses-from-apns)."""
 
+    def __init__(self, status_code: int, reason: Optional[str]):
+        super().__init__(f"APNs {status_code}: {reason or 'unknown'}")
+        self.status_code = status_code
+        self.reason = reason
 
-async def send_push(device_token: str, title: str, body: str, extra: dict = None) -> None:
-    """Send an APNs push notification to a Watch device token.
-
-    extra: additional key/value pairs merged into the payload (alongside 'aps').
-    Raises httpx.HTTPStatusError on APNs error responses.
-    """
-    payload = {
-        "aps": {
-            "alert": {"title": title, "body": body},
-            "sound": "default",
+    @property
+    def dead_token(self) -> bool:
+        return self.status_code == 410 or self.reason in DEAD_TOKEN_REASONS
+
+    @property
+    def disable_token(self) -> bool:
+        return self.reason in DISABLE_TOKEN_REASONS
+
+    @property
+    def token_failure(self) -> bool:
+        """APNs rejected this send for this token. Outages (5xx), throttling (429)
+        and our own credential errors say nothing about the device."""
+        return 400 <= self.status_code < 500 and self.status_code != 429 \
+            and self.reason not in PROVIDER_ERROR_REASONS
+
+
+def _error_reason(response: httpx.Response) -> Optional[str]:
+    try:
+        return response.json().get("reason")
+    except ValueError:
+        return None
+
+
+class APNsClient:
+    def __init__(
+        self,
+        key_id: Optional[str] = APNS_KEY_ID,
+        team_id: str = APNS_TEAM_ID,
+        auth_key_path: Optional[str] = APNS_AUTH_KEY_PATH,
+        host: str = APNS_HOST,
+        topic: str = WATCH_BUNDLE_ID,
+        max_concurrency: int = APNS_MAX_CONCURRENCY,
+        verify: bool | str = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """transport replaces the network, e.g. an httpx.MockTransport standing in
+        for APNs in tests."""
+        self.key_id = key_id
+        self.team_id = team_id
+        self.auth_key_path = auth_key_path
+        self.host = host
+        self.topic = topic
+        self.max_concurrency = max_concurrency
+        self.verify = verify
+        self.transport = transport
+        self._signing_key = None
+        self._token: Optional[str] = None
+        self._token_issued_at = 0.0
+        self._http: Optional[httpx.AsyncClient] = None
+        # Shared across fan-outs, so concurrent triggers and scheduler batches
+        # together stay under max_concurrency streams.
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    def _load_signing_key(self):
+        if self._signing_key is None:
+            if not self.auth_key_path:
+                raise RuntimeError("APNS_AUTH_KEY_PATH not set")
+            with open(self.auth_key_path, "rb") as f:
+                self._signing_key = load_pem_private_key(f.read(), password=None)
+        return self._signing_key
+
+    def provider_token(self) -> str:
+        """The signed provider JWT, re-signed only once it's TOKEN_TTL old."""
+        now = time.time()
+        if self._token is None or now - self._token_issued_at >= TOKEN_TTL:
+            self._token = jwt.encode(
+                {"iss": self.team_id, "iat": int(now)},
+                self._load_signing_key(),
+                algorithm="ES256",
+                headers={"kid": self.key_id},
+            )
+            self._token_issued_at = now
+        return self._token
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.host,
+                http2=True,
+                verify=self.verify,
+                transport=self.transport,
+                timeout=httpx.Timeout(10.0, connect=5.0),
+                limits=httpx.Limits(max_connections=1, max_keepalive_connections=1),
+            )
+        return self._http
+
+    async def send(self, device_token: str, title: str, body: str, extra: dict = None) -> httpx.Response:
+        """Send an APNs push notification to a Watch device token.
+
+        extra: additional key/value pairs merged into the payload (alongside 'aps').
+        Raises APNsError on APNs error responses.
+        """
+        payload = {
+            "aps": {
+                "alert": {"title": title, "body": body},
+                "sound": "default",
+            }
         }
+        if extra:
+            payload.update(extra)
+        content = json.dumps(payload)
+
+        logger.info("APNs send → %s host=%s topic=%s", device_token[:8] + "...", self.host, self.topic)
+        logger.debug("APNs payload: %s", content)
+
+        for attempt in range(2):
+            response = await self._client().post(
+                f"/3/device/{device_token}",
+                content=content,
+                headers={
+                    "authorization": f"bearer {self.provider_token()}",
+                    "apns-topic": self.topic,
+                    "apns-push-type": "alert",
+                    "apns-priority": "10",
+                },
+            )
+            logger.info("APNs response: status=%s apns-id=%s body=%s",
+                        response.status_code,
+                        response.headers.get("apns-id", "none"),
+                        response.text or "(empty)")
+            if response.status_code == 200:
+                return response
+            reason = _error_reason(response)
+            # A cached token can still be rejected (clock skew, key rotation):
+            # re-sign once and retry.
+            if attempt == 0 and reason == "ExpiredProviderToken":
+                self._token = None
+                continue
+            raise APNsError(response.status_code, reason)
+
+    async def send_many(
+        self, device_tokens: list[str], title: str, body: str, extra: dict = None,
+    ) -> list[Optional[Exception]]:
+        """Push to every token concurrently, at most max_concurrency in flight.
+        Returns one entry per token: None on success, else the exception."""
+        async def send_one(token: str) -> Optional[Exception]:
+            async with self._semaphore:
+                try:
+                    await self.send(token, title, body, extra)
+                except Exception as e:
+                    return e
+                return None
+
+        return await asyncio.gather(*(send_one(t) for t in device_tokens))
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def checkin_push(flow, schedule_type: str) -> tuple[str, str, dict]:
+    """(title, body, extra) for a check-in push. The full flow definition rides in
+    the payload so the Watch can run it without a network round-trip."""
+    extra = {
+        "flow_id": str(flow.id),
+        "flow_name": flow.name,
+        "steps_json": json.dumps(flow.steps_json),
+        "schedule_type": schedule_type,
     }
-    if extra:
-        payload.update(extra)
-
-    token = _make_jwt()
-    url = f"{APNS_HOST}/3/device/{device_token}"
-    headers = {
-        "authorization": f"bearer {token}",
-        "apns-topic": WATCH_BUNDLE_ID,
-        "apns-push-type": "alert",
-        "apns-priority": "10",
-    }
+    body = flow.steps_json[0]["prompt"] if flow.steps_json else "Time to check in."
+    return "Check In", body, extra
+
+
+client = APNsClient()
+
+
+async def record_results(
+    session: AsyncSession, devices: list[DeviceToken], results: list[Optional[Exception]],
+) -> None:
+    """Apply a fan-out's outcome to the device rows: dead tokens are deleted,
+    wrong-topic or repeatedly rejected ones are disabled, and every token gets its
+    last success/failure stamped. Transport errors, APNs outages and throttling
+    leave the failure count alone, so they can't switch devices off. The caller
+    commits."""
+    now = datetime.now(timezone.utc)
+    for device, error in zip(devices, results):
+        if error is None:
+            device.last_success_at = now
+            device.failure_count = 0
+            session.add(device)
+            continue
+        if isinstance(error, APNsError) and error.dead_token:
+            logger.info("APNs: deleting dead token %s (%s)", device.token[:8] + "...", error.reason)
+            await session.delete(device)
+            continue
+        device.last_failure_at = now
+        device.last_failure_reason = error.reason if isinstance(error, APNsError) else type(error).__name__
+        if isinstance(error, APNsError) and error.token_failure:
+            device.failure_count += 1
+        if (isinstance(error, APNsError) and error.disable_token) \
+                or device.failure_count >= MAX_CONSECUTIVE_FAILURES:
+            logger.info("APNs: disabling token %s (%s)", device.token[:8] + "...", device.last_failure_reason)
+            device.disabled_at = now
+        session.add(device)
+
+
+async def send_push(device_token: str, title: str, body: str, extra: dict = None) -> None:
+    """Send one push through the shared client."""
+    await client.send(device_token, title, body, extra)
+
 
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.info("APNs send → %s host=%s topic=%s", device_token[:8] + "...", APNS_HOST, WATCH_BUNDLE_ID)
-    logger.info("APNs payload: %s", json.dumps(payload))
-
-    async with httpx.AsyncClient(http2=True) as client:
-        response = await client.post(url, content=json.dumps(payload), headers=headers)
-        logger.info("APNs response: status=%s apns-id=%s body=%s",
-                    response.status_code,
-                    response.headers.get("apns-id", "none"),
-                    response.text or "(empty)")
-        response.raise_for_status()
+async def close() -> None:
+    await client.aclose()
 
 
 def is_configured() -> bool:
@@ -1,12 +1,16 @@
+import copy
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
 from uuid import UUID
 import jwt
-import bcrypt
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlmodel import Session, select
-from app.db import get_session
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
 from app.models import User
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY")
@@ -17,15 +21,72 @@ if not SECRET_KEY:
 ALGORITHM = "HS256"
 TOKEN_EXPIRE_DAYS = 90
 
+# Per-process caches for get_current_user. Writes in this process invalidate
+# immediately; other uvicorn workers see changes within AUTH_CACHE_TTL_SECONDS.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
 security = HTTPBearer()
 
 
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+class TTLCache:
+    """Bounded LRU map whose entries expire after ttl seconds."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return bcrypt.checkpw(password.encode(), password_hash.encode())
+# raw bearer token -> (user_id, exp timestamp)
+token_cache = TTLCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+# user_id -> User column values (a dict, not the instance: each request gets its
+# own object so concurrent requests never share ORM state)
+user_cache = TTLCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
+
+def invalidate_user(user_id: UUID) -> None:
+    """Drop the cached row after the user changes. Decoded tokens stay cached: the
+    lookup that follows them reloads the user (or 401s if it's gone)."""
+    user_cache.pop(user_id)
+
+
+def auth_cache_stats() -> dict:
+    return {"tokens": token_cache.stats(), "users": user_cache.stats()}
 
 
 def create_token(user_id: UUID) -> str:
@@ -36,16 +97,34 @@ def create_token(user_id: UUID) -> str:
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> User:
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user_id = UUID(payload["sub"])
-    user = session.get(User, user_id)
+    raw_token = credentials.credentials
+    cached = token_cache.get(raw_token)
+    if cached and cached[1] > time.time():
+        user_id = cached[0]
+    else:
+        try:
+            payload = jwt.decode(raw_token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        user_id = UUID(payload["sub"])
+        token_cache.put(raw_token, (user_id, payload["exp"]))
+
+    row = user_cache.get(user_id)
+    if row is not None:
+        # Attach a fresh detached copy to this request's session: routes can
+        # modify and commit it as if it had been loaded here. Deep, so JSONB
+        # values (conversation_starters) aren't shared with other requests.
+        user = User(**copy.deepcopy(row))
+        make_transient_to_detached(user)
+        session.add(user)
+        return user
+
+    user = await session.get(User, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    user_cache.put(user_id, user.model_dump())
     return user
@@ -0,0 +1,83 @@
+"""Shared outbound API clients: one Anthropic, OpenAI and S3 client per process.
+
+Each SDK client owns a connection pool, so building one per request pays a fresh
+TCP + TLS handshake every time. The server creates these at startup and closes
+them at shutdown; the transcription worker and scripts get them lazily on first
+use. Routes take them as dependencies (anthropic_client etc.), so tests can swap
+in fakes with app.dependency_overrides.
+"""
+import os
+import threading
+
+import anthropic
+import boto3
+import openai
+
+ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._anthropic: anthropic.AsyncAnthropic | None = None
+        self._openai: openai.OpenAI | None = None
+        self._s3 = None
+        # boto3's default session isn't safe to build clients from concurrently.
+        self._lock = threading.Lock()
+
+    @property
+    def anthropic(self) -> anthropic.AsyncAnthropic:
+        if self._anthropic is None:
+            self._anthropic = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+        return self._anthropic
+
+    @property
+    def openai(self) -> openai.OpenAI:
+        """Sync client: Whisper calls run in the transcription worker's threads."""
+        with self._lock:
+            if self._openai is None:
+                self._openai = openai.OpenAI(api_key=OPENAI_API_KEY)
+            return self._openai
+
+    @property
+    def s3(self):
+        with self._lock:
+            if self._s3 is None:
+                self._s3 = boto3.client("s3", region_name=AWS_REGION, endpoint_url=S3_ENDPOINT_URL)
+            return self._s3
+
+    def start(self) -> None:
+        """Build the clients up front, so no request pays for it."""
+        self.anthropic
+        self.s3
+        if OPENAI_API_KEY:
+            self.openai
+
+    async def aclose(self) -> None:
+        if self._anthropic is not None:
+            await self._anthropic.close()
+            self._anthropic = None
+        with self._lock:
+            if self._openai is not None:
+                self._openai.close()
+                self._openai = None
+            if self._s3 is not None:
+                self._s3.close()
+                self._s3 = None
+
+
+clients = ClientRegistry()
+
+
+def anthropic_client() -> anthropic.AsyncAnthropic:
+    return clients.anthropic
+
+
+def openai_client() -> openai.OpenAI:
+    return clients.openai
+
+
+def s3_client():
+    return clients.s3
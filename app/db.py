@@ -1,18 +1,58 @@
 import os
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql:///sit")
+# Same database, asyncpg driver. Override only if the async DSN genuinely differs.
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    make_url(DATABASE_URL).set(drivername="postgresql+asyncpg").render_as_string(hide_password=False),
+)
 
+# Pool sizing for the async engine. pool_size + max_overflow caps concurrent
+# Postgres connections per uvicorn worker; recycle keeps idle connections from
+# outliving server-side timeouts.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Sync engine: migrations, scripts, and the morning router.
 engine = create_engine(DATABASE_URL, echo=False)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_recycle=DB_POOL_RECYCLE,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+)
+
+# expire_on_commit=False: attribute access after commit would otherwise trigger
+# an implicit (sync) reload, which AsyncSession can't do.
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
 
 def get_session():
     with Session(engine) as session:
         yield session
 
 
+async def get_async_session():
+    async with async_session_maker() as session:
+        yield session
+
+
 def init_db():
     SQLModel.metadata.create_all(engine)
+
+
+async def close_db():
+    await async_engine.dispose()
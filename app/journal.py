@@ -2,24 +2,173 @@
 
 The file is newest-first: a one-line italic description, then `### [[date]] title`
 entries. Obsidian's own sync propagates changes; we only touch the local file.
+
+Lookups go through an in-memory index of heading → byte offsets, rebuilt only when
+the file's mtime or size changes (one stat per call otherwise). Reads then seek to
+and decode just the entries they need, so building the morning system prompt
+costs the same however long the log grows.
+
+Writes never touch the live file in place: the new content goes to a temp file in
+the same directory, is fsynced, and renamed over the log, so a crash leaves either
+the old file or the new one. Read-modify-write cycles hold an advisory lock
+(concurrent sessions, the close-stale sweep) and re-check the file's stamp before
+renaming, redoing the edit if something that doesn't take our lock — Obsidian
+sync — changed the file meanwhile.
 """
+import fcntl
 import os
 import re
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import date, datetime
+from typing import Callable, NamedTuple
 
 WAKE_UP_LOG = os.getenv("WAKE_UP_LOG", os.path.expanduser("~/notes/Logs/Wake up.md"))
 
 HEADING_RE = re.compile(r"^### \[\[(?P<date>[^\]]+)\]\]\s*(?P<title>.*)$")
+# Any `### ` line ends an entry block for read_entry/update_entry.
+_BLOCK_START_RE = re.compile(rb"^### [^\n]*", re.MULTILINE)
+# Attempts at a read-modify-write before giving up on a file that keeps changing.
+_WRITE_ATTEMPTS = 5
+
+
+class _Entry(NamedTuple):
+    raw_date: str
+    title: str
+    start: int  # byte offset of the heading line
+    body_start: int  # byte offset just past the heading line
+    end: int  # byte offset of the next dated heading, or EOF
+
+
+class _Block(NamedTuple):
+    start: int
+    body_start: int
+    end: int  # byte offset of the next `### ` line, or EOF
+
+
+class _JournalIndex:
+    def __init__(self):
+        self.path = None
+        self.stamp = None
+        self.entries: list[_Entry] = []
+        self.blocks: dict[str, _Block] = {}
+        self._lock = threading.Lock()
+
+    def read(self, pick: Callable[["_JournalIndex"], tuple[int, int]]) -> str:
+        """Decode the byte range pick(index) selects. The index is checked against
+        the same open file the range is read from, so an outside edit (Obsidian
+        sync) between the two can't skew the offsets."""
+        with open(WAKE_UP_LOG, "rb") as f:
+            st = os.fstat(f.fileno())
+            with self._lock:
+                if WAKE_UP_LOG != self.path or (st.st_mtime_ns, st.st_size) != self.stamp:
+                    data = f.read()
+                    self._build(data, (st.st_mtime_ns, st.st_size))
+                    start, end = pick(self)
+                    return data[start:end].decode("utf-8")
+                start, end = pick(self)
+            f.seek(start)
+            return f.read(end - start).decode("utf-8")
+
+    def load(self) -> tuple[bytes, tuple[int, int]]:
+        """The whole file and its stamp, with the index rebuilt from exactly these bytes."""
+        with open(WAKE_UP_LOG, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            self._build(data, stamp)
+        return data, stamp
+
+    def rebuild(self, data: bytes) -> None:
+        """Re-index content we just wrote, without reading it back."""
+        st = os.stat(WAKE_UP_LOG)
+        with self._lock:
+            self._build(data, (st.st_mtime_ns, st.st_size))
+
+    def _build(self, data: bytes, stamp: tuple[int, int]) -> None:
+        headings = []
+        for m in _BLOCK_START_RE.finditer(data):
+            headings.append((m.start(), min(m.end() + 1, len(data)), m.group().decode("utf-8").rstrip("\r")))
+
+        blocks: dict[str, _Block] = {}
+        for i, (start, body_start, text) in enumerate(headings):
+            end = headings[i + 1][0] if i + 1 < len(headings) else len(data)
+            blocks.setdefault(text, _Block(start, body_start, end))
+
+        dated = [(start, body_start, HEADING_RE.match(text)) for start, body_start, text in headings]
+        dated = [(start, body_start, m) for start, body_start, m in dated if m]
+        entries = []
+        for i, (start, body_start, m) in enumerate(dated):
+            end = dated[i + 1][0] if i + 1 < len(dated) else len(data)
+            entries.append(_Entry(m.group("date"), m.group("title"), start, body_start, end))
+
+        self.path, self.stamp = WAKE_UP_LOG, stamp
+        self.entries, self.blocks = entries, blocks
+
+
+_index = _JournalIndex()
+
+
+def _stamp() -> tuple[int, int]:
+    st = os.stat(WAKE_UP_LOG)
+    return st.st_mtime_ns, st.st_size
+
+
+@contextmanager
+def _write_lock():
+    """Exclusive advisory lock on a hidden sidecar file (Obsidian ignores dotfiles).
+    flock locks belong to the open file, so this serializes threads as well as
+    processes."""
+    directory, name = os.path.split(WAKE_UP_LOG)
+    with open(os.path.join(directory, f".{name}.lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _atomic_write(data: bytes) -> None:
+    directory = os.path.dirname(WAKE_UP_LOG)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".wake-up-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(WAKE_UP_LOG).st_mode))
+        os.replace(tmp_path, WAKE_UP_LOG)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    # Persist the rename itself.
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
 
 
-def _read_lines() -> list[str]:
-    with open(WAKE_UP_LOG, encoding="utf-8") as f:
-        return f.read().splitlines()
+def _modify(edit: Callable[[bytes], bytes]) -> None:
+    """Apply edit() to the file's bytes under the write lock, atomically. If the
+    file changes between our read and the rename, re-read and re-apply."""
+    with _write_lock():
+        for _ in range(_WRITE_ATTEMPTS):
+            data, stamp = _index.load()
+            new_data = edit(data)
+            if _stamp() != stamp:
+                continue
+            _atomic_write(new_data)
+            _index.rebuild(new_data)
+            return
+    raise RuntimeError(f"{WAKE_UP_LOG} kept changing; journal write abandoned")
 
 
-def _write_lines(lines: list[str]) -> None:
-    with open(WAKE_UP_LOG, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines) + "\n")
+def _render(heading: str, body: str) -> bytes:
+    return "".join(line + "\n" for line in [heading] + body.strip().splitlines()).encode("utf-8")
 
 
 def _format_date(raw: str) -> str:
@@ -30,26 +179,27 @@ def _format_date(raw: str) -> str:
 
 
 def read_entries(limit: int | None = None) -> list[dict]:
-    entries = []
-    current = None
-    for line in _read_lines():
-        m = HEADING_RE.match(line)
-        if m:
-            if current:
-                entries.append(current)
-                if limit and len(entries) >= limit:
-                    return entries
-            current = {
-                "date": _format_date(m.group("date")),
-                "raw_date": m.group("date"),
-                "title": m.group("title"),
-                "body": "",
-            }
-        elif current is not None:
-            current["body"] += line + "\n"
-    if current and not (limit and len(entries) >= limit):
-        entries.append(current)
-    return entries
+    picked: list[_Entry] = []
+
+    def pick(index: _JournalIndex) -> tuple[int, int]:
+        picked.extend(index.entries[:limit] if limit else index.entries)
+        return (picked[0].body_start, picked[-1].end) if picked else (0, 0)
+
+    # One contiguous read covering just the requested entries.
+    text = _index.read(pick).encode("utf-8")
+    base = picked[0].body_start if picked else 0
+    return [
+        {
+            "date": _format_date(e.raw_date),
+            "raw_date": e.raw_date,
+            "title": e.title,
+            "body": "".join(
+                line + "\n"
+                for line in text[e.body_start - base:e.end - base].decode("utf-8").splitlines()
+            ),
+        }
+        for e in picked
+    ]
 
 
 def make_heading(title: str, today: date) -> str:
@@ -60,34 +210,41 @@ def write_entry(heading: str, body: str) -> None:
     """Insert a new entry in date order (the file is newest-first): normally right
     after the description line, but a backdated entry lands below newer-dated ones."""
     new_date = HEADING_RE.match(heading).group("date")
-    lines = _read_lines()
-    insert_at = len(lines)
-    for i, line in enumerate(lines[1:], start=1):
-        m = HEADING_RE.match(line)
-        if m and m.group("date") <= new_date:
-            insert_at = i
-            break
-    entry = [heading] + body.strip().splitlines()
-    lines[insert_at:insert_at] = entry
-    _write_lines(lines)
+
+    def edit(data: bytes) -> bytes:
+        first_line_end = data.find(b"\n") + 1 or len(data)
+        insert_at = next(
+            (e.start for e in _index.entries if e.start >= first_line_end and e.raw_date <= new_date),
+            len(data),
+        )
+        prefix = data[:insert_at]
+        if prefix and not prefix.endswith(b"\n"):
+            prefix += b"\n"
+        return prefix + _render(heading, body) + data[insert_at:]
+
+    _modify(edit)
+
+
+def _block(index: _JournalIndex, heading: str) -> _Block:
+    try:
+        return index.blocks[heading]
+    except KeyError:
+        raise ValueError(f"{heading!r} is not in the journal")
 
 
 def read_entry(heading: str) -> str:
     """Return the body of the entry with this exact heading line."""
-    lines = _read_lines()
-    start = lines.index(heading)
-    end = start + 1
-    while end < len(lines) and not lines[end].startswith("### "):
-        end += 1
-    return "\n".join(lines[start + 1:end])
+    def pick(index: _JournalIndex) -> tuple[int, int]:
+        block = _block(index, heading)
+        return block.body_start, block.end
+
+    return "\n".join(_index.read(pick).splitlines())
 
 
 def update_entry(old_heading: str, new_heading: str, body: str) -> None:
     """Replace the block starting at old_heading (through the next heading) in place."""
-    lines = _read_lines()
-    start = lines.index(old_heading)
-    end = start + 1
-    while end < len(lines) and not lines[end].startswith("### "):
-        end += 1
-    lines[start:end] = [new_heading] + body.strip().splitlines()
-    _write_lines(lines)
+    def edit(data: bytes) -> bytes:
+        block = _block(_index, old_heading)
+        return data[:block.start] + _render(new_heading, body) + data[block.end:]
+
+    _modify(edit)
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from typing import Optional
 from uuid import UUID
 import uuid
@@ -17,6 +17,8 @@ class User(SQLModel, table=True):
     notification_count: int = 3
     notification_start_hour: int = 9
     notification_end_hour: int = 22
+    # IANA zone the notification window is interpreted in (server-side scheduler).
+    timezone: Optional[str] = Field(default=None, sa_column=sa.Column(sa.String, nullable=True))
     conversation_starters: Optional[list] = Field(default=None, sa_column=Column(JSONB))
     has_seen_onboarding: bool = False
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
@@ -37,6 +39,10 @@ class Flow(SQLModel, table=True):
 
 class Sit(SQLModel, table=True):
     __tablename__ = "sits"
+    __table_args__ = (
+        sa.Index("ix_sits_user_id_started_at", "user_id", "started_at"),
+        sa.Index("ix_sits_user_id_updated_at", "user_id", "updated_at"),
+    )
     id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: UUID = Field(foreign_key="users.id")
     duration_seconds: float
@@ -45,10 +51,16 @@ class Sit(SQLModel, table=True):
     time_known: bool = Field(default=True, sa_column=sa.Column(sa.Boolean, nullable=False, server_default=sa.true()))
     timezone: Optional[str] = Field(default=None, sa_column=sa.Column(sa.String, nullable=True))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+    # Bumped on every ORM update; drives the sync feed's updated_since mode.
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), onupdate=lambda: datetime.now(timezone.utc)))
 
 
 class Checkin(SQLModel, table=True):
     __tablename__ = "checkins"
+    __table_args__ = (
+        sa.Index("ix_checkins_user_id_responded_at", "user_id", "responded_at"),
+        sa.Index("ix_checkins_user_id_updated_at", "user_id", "updated_at"),
+    )
     id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: UUID = Field(foreign_key="users.id")
     flow_id: Optional[UUID] = Field(default=None, foreign_key="flows.id")
@@ -61,6 +73,18 @@ class Checkin(SQLModel, table=True):
     schedule_type: Optional[str] = None
     timezone: Optional[str] = Field(default=None, sa_column=sa.Column(sa.String, nullable=True))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now(), onupdate=lambda: datetime.now(timezone.utc)))
+
+
+class DeletedPromptResponse(SQLModel, table=True):
+    """Tombstone for a deleted sit or checkin, so incremental sync clients learn
+    about the deletion. id is the deleted row's id."""
+    __tablename__ = "deleted_prompt_responses"
+    __table_args__ = (sa.Index("ix_deleted_prompt_responses_user_id_deleted_at", "user_id", "deleted_at"),)
+    id: UUID = Field(primary_key=True)
+    user_id: UUID = Field(sa_column=sa.Column(sa.Uuid, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False))
+    kind: str  # sit | checkin
+    deleted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
 
 
 class DeviceToken(SQLModel, table=True):
@@ -69,23 +93,38 @@ class DeviceToken(SQLModel, table=True):
     user_id: UUID = Field(foreign_key="users.id")
     token: str = Field(unique=True)
     platform: str
+    last_success_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
+    last_failure_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
+    last_failure_reason: Optional[str] = None
+    failure_count: int = Field(default=0, sa_column=sa.Column(sa.Integer, nullable=False, server_default="0"))
+    # Set when APNs says the token can't receive our pushes; fan-outs skip it
+    # until the device registers again.
+    disabled_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
 
 
 class MorningSession(SQLModel, table=True):
     __tablename__ = "morning_sessions"
+    __table_args__ = (sa.Index("ix_morning_sessions_user_id_created_at", "user_id", "created_at"),)
     id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: UUID = Field(foreign_key="users.id")
     journal_heading: Optional[str] = Field(default=None, sa_column=Column(Text))
     journal_written_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
     sit_id: Optional[UUID] = Field(default=None, foreign_key="sits.id")
+    # Rolling summary of the session's older messages, through this message's id
+    # (app/routers/morning.py build_context).
+    context_summary: Optional[str] = Field(default=None, sa_column=Column(Text))
+    context_summary_through: Optional[UUID] = None
+    # Set while a stale-session sweep runs the closing turn (close_session).
+    closing_started_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
 
 
 class MorningMessage(SQLModel, table=True):
     __tablename__ = "morning_messages"
+    __table_args__ = (sa.Index("ix_morning_messages_session_id_created_at", "session_id", "created_at"),)
     id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
-    session_id: UUID = Field(foreign_key="morning_sessions.id", index=True)
+    session_id: UUID = Field(foreign_key="morning_sessions.id")
     role: str  # user | assistant | tool | sit
     content: str = Field(sa_column=Column(Text))
     tool_label: Optional[str] = None
@@ -94,8 +133,78 @@ class MorningMessage(SQLModel, table=True):
 
 class ChatMessage(SQLModel, table=True):
     __tablename__ = "chat_messages"
+    __table_args__ = (sa.Index("ix_chat_messages_user_id_created_at", "user_id", "created_at"),)
     id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
     user_id: UUID = Field(foreign_key="users.id")
     role: str
     content: str = Field(sa_column=Column(Text))
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+
+
+class TranscriptionJob(SQLModel, table=True):
+    """Queued Whisper transcription for a checkin's voice note, claimed by the
+    transcription worker (app/transcription.py)."""
+    __tablename__ = "transcription_jobs"
+    __table_args__ = (sa.Index("ix_transcription_jobs_status_next_attempt_at", "status", "next_attempt_at"),)
+    id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
+    checkin_id: UUID = Field(sa_column=sa.Column(sa.Uuid, sa.ForeignKey("checkins.id", ondelete="CASCADE"), nullable=False, index=True))
+    status: str = "pending"  # pending | running | completed | failed
+    attempts: int = 0
+    last_error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+    locked_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+
+
+class ScheduledCheckin(SQLModel, table=True):
+    """One planned check-in push: slot N of the user's notification_count for a
+    local date. Fired by app/scheduler.py."""
+    __tablename__ = "scheduled_checkins"
+    __table_args__ = (
+        sa.UniqueConstraint("user_id", "local_date", "slot", name="uq_scheduled_checkins_user_date_slot"),
+        sa.Index("ix_scheduled_checkins_status_fire_at", "status", "fire_at"),
+    )
+    id: UUID = Field(primary_key=True, default_factory=uuid.uuid4)
+    user_id: UUID = Field(sa_column=sa.Column(sa.Uuid, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False))
+    local_date: date = Field(sa_column=sa.Column(sa.Date, nullable=False))
+    slot: int
+    fire_at: datetime = Field(sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+    status: str = "pending"  # pending | sent | failed | missed
+    sent_at: Optional[datetime] = Field(default=None, sa_column=sa.Column(sa.DateTime(timezone=True), nullable=True))
+    error: Optional[str] = Field(default=None, sa_column=Column(Text))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+
+
+class NotebookLMAnswer(SQLModel, table=True):
+    """Cached ask_notebooklm answer, keyed by normalized question text (app/notebooklm.py)."""
+    __tablename__ = "notebooklm_answers"
+    __table_args__ = (sa.Index("ix_notebooklm_answers_last_used_at", "last_used_at"),)
+    normalized_question: str = Field(sa_column=sa.Column(Text, primary_key=True))
+    question: str = Field(sa_column=Column(Text, nullable=False))
+    answer: str = Field(sa_column=Column(Text, nullable=False))
+    hit_count: int = 0
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+    last_used_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+
+
+class MorningTurnEvent(SQLModel, table=True):
+    """One streamed event of a morning agent turn, spilled from memory so a client
+    can resume the stream (app/turns.py)."""
+    __tablename__ = "morning_turn_events"
+    __table_args__ = (sa.Index("ix_morning_turn_events_created_at", "created_at"),)
+    turn_id: UUID = Field(primary_key=True)
+    seq: int = Field(primary_key=True)
+    session_id: UUID = Field(sa_column=sa.Column(sa.Uuid, sa.ForeignKey("morning_sessions.id", ondelete="CASCADE"), nullable=False))
+    event: dict = Field(sa_column=sa.Column(JSONB, nullable=False))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
+
+
+class DailyPracticeStats(SQLModel, table=True):
+    """Per-user totals for one local date, maintained by app/practice_stats.py."""
+    __tablename__ = "daily_practice_stats"
+    user_id: UUID = Field(sa_column=sa.Column(sa.Uuid, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True))
+    local_date: date = Field(sa_column=sa.Column(sa.Date, primary_key=True))
+    sit_minutes: int = 0
+    sit_count: int = 0
+    checkin_count: int = 0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False))
@@ -0,0 +1,183 @@
+"""Ask the Rigdzin NotebookLM notebook, through a persistent answer cache.
+
+The `notebooklm` CLI takes a minute or two per question, and the morning agent
+asks much the same things across sessions. Answers are kept in the
+notebooklm_answers table, keyed by the question's normalized text (case,
+punctuation and spacing folded), so a repeat — verbatim or reworded only
+cosmetically — is answered from Postgres. Entries expire after
+NOTEBOOKLM_CACHE_TTL_DAYS and the table is trimmed to the
+NOTEBOOKLM_CACHE_MAX_ENTRIES most recently used. Failed queries aren't cached.
+
+Concurrent asks of the same question in one process share a single CLI run. It
+runs as its own task, so one asker being cancelled never cancels the others; it
+is killed only once every asker has gone.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+
+from app.db import async_session_maker
+from app.models import NotebookLMAnswer
+
+logger = logging.getLogger(__name__)
+
+NOTEBOOKLM_BIN = os.getenv("NOTEBOOKLM_BIN", "notebooklm")
+NOTEBOOKLM_TIMEOUT = 180
+CACHE_TTL = timedelta(days=float(os.getenv("NOTEBOOKLM_CACHE_TTL_DAYS", "30")))
+CACHE_MAX_ENTRIES = int(os.getenv("NOTEBOOKLM_CACHE_MAX_ENTRIES", "2000"))
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class CacheStats:
+    """Per-process lookup counters; the table's hit_count totals survive restarts."""
+
+    def __init__(self):
+        self.exact_hits = 0
+        self.normalized_hits = 0
+        self.misses = 0
+
+    def as_dict(self) -> dict:
+        hits = self.exact_hits + self.normalized_hits
+        total = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "normalized_hits": self.normalized_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+class _Flight:
+    """One in-progress CLI run and the number of asks waiting on it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+stats = CacheStats()
+_inflight: dict[str, _Flight] = {}
+
+
+def normalize(question: str) -> str:
+    """Matching key: casefolded, punctuation dropped, whitespace collapsed."""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    return _SPACE_RE.sub(" ", _NON_WORD_RE.sub(" ", text)).strip()
+
+
+async def _run(question: str) -> tuple[bool, str]:
+    """One CLI query. Returns (ok, answer or failure message)."""
+    proc = await asyncio.create_subprocess_exec(
+        NOTEBOOKLM_BIN, "ask", "--json", question,
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=NOTEBOOKLM_TIMEOUT)
+    except BaseException:
+        # Timed out, or the turn was cancelled: don't leave the CLI running.
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    if proc.returncode != 0:
+        return False, f"(NotebookLM query failed: {stderr.decode(errors='replace').strip()[-500:]})"
+    return True, json.loads(stdout)["answer"]
+
+
+async def lookup(question: str) -> Optional[str]:
+    """The cached answer for this question, or None. Counts the hit or miss."""
+    key = normalize(question)
+    now = datetime.now(timezone.utc)
+    async with async_session_maker() as session:
+        row = (await session.exec(
+            select(NotebookLMAnswer).where(
+                NotebookLMAnswer.normalized_question == key,
+                NotebookLMAnswer.created_at > now - CACHE_TTL,
+            )
+        )).first()
+        if row is None:
+            stats.misses += 1
+            return None
+        if row.question == question:
+            stats.exact_hits += 1
+        else:
+            stats.normalized_hits += 1
+        row.hit_count += 1
+        row.last_used_at = now
+        session.add(row)
+        await session.commit()
+        return row.answer
+
+
+async def store(question: str, answer: str) -> None:
+    """Upsert the answer (replacing an expired one), then evict past the size bound."""
+    now = datetime.now(timezone.utc)
+    values = {
+        "normalized_question": normalize(question), "question": question, "answer": answer,
+        "hit_count": 0, "created_at": now, "last_used_at": now,
+    }
+    async with async_session_maker() as session:
+        stmt = insert(NotebookLMAnswer).values(values)
+        await session.exec(stmt.on_conflict_do_update(
+            index_elements=["normalized_question"],
+            set_={k: stmt.excluded[k] for k in values if k != "normalized_question"},
+        ))
+        await session.exec(delete(NotebookLMAnswer).where(NotebookLMAnswer.created_at <= now - CACHE_TTL))
+        keep = (
+            select(NotebookLMAnswer.normalized_question)
+            .order_by(NotebookLMAnswer.last_used_at.desc())
+            .limit(CACHE_MAX_ENTRIES)
+        )
+        await session.exec(delete(NotebookLMAnswer).where(NotebookLMAnswer.normalized_question.not_in(keep)))
+        await session.commit()
+
+
+async def ask(question: str) -> str:
+    """Answer from the cache if possible, otherwise run the CLI and cache the answer."""
+    cached = await lookup(question)
+    if cached is not None:
+        logger.info("NotebookLM cache hit (%s)", stats.as_dict())
+        return cached
+
+    key = normalize(question)
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _inflight[key] = _Flight(asyncio.create_task(_fetch(question)))
+        flight.task.add_done_callback(
+            lambda _: _inflight.pop(key) if _inflight.get(key) is flight else None
+        )
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            # Nobody is left to read the answer: stop the CLI.
+            flight.task.cancel()
+
+
+async def _fetch(question: str) -> str:
+    ok, answer = await _run(question)
+    if ok:
+        await store(question, answer)
+    return answer
+
+
+async def cache_stats() -> dict:
+    """Lookup counters for this process, plus the table's size and lifetime hits."""
+    async with async_session_maker() as session:
+        entries, lifetime_hits = (await session.exec(
+            select(func.count(), func.coalesce(func.sum(NotebookLMAnswer.hit_count), 0))
+        )).one()
+    return {**stats.as_dict(), "entries": entries, "lifetime_hits": lifetime_hits}
@@ -0,0 +1,18 @@
+"""Opaque keyset-pagination cursors: a (timestamp, id) position, base64-encoded."""
+import base64
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import HTTPException
+
+
+def encode_cursor(ts: datetime, id: UUID) -> str:
+    return base64.urlsafe_b64encode(f"{ts.isoformat()}|{id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        ts, id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(ts), UUID(id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
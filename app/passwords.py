@@ -0,0 +1,67 @@
+"""bcrypt hashing on a dedicated process pool.
+
+bcrypt is deliberately slow (~100-300 ms of CPU per call at the default cost), so
+it runs in its own bounded pool of worker processes rather than on the event loop
+or the shared threadpool: a burst of logins queues here without stalling any
+other endpoint. This module is kept import-light because each worker process
+imports it.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+# Work factor for new hashes. Hashes at any other cost still verify, and are
+# upgraded transparently at the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # forkserver: workers fork from a clean process, not from the server with
+        # its event loop, threads and open connections.
+        _pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+    return _pool
+
+
+def _hashpw(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def _checkpw(password: bytes, password_hash: bytes) -> bool:
+    return bcrypt.checkpw(password, password_hash)
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), _hashpw, password.encode(), BCRYPT_ROUNDS)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), _checkpw, password.encode(), password_hash.encode())
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if the hash was made at a cost other than BCRYPT_ROUNDS ($2b$<cost>$...)."""
+    try:
+        return int(password_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def shutdown() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
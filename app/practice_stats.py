@@ -0,0 +1,80 @@
+"""Per-user, per-local-day practice rollups (the daily_practice_stats table).
+
+Every place that inserts or deletes a sit or checkin calls sit_added/sit_removed/
+checkin_added/checkin_removed in the same transaction, so the rollup commits or
+rolls back with the row it counts. A row's local date comes from the timezone it
+was logged in, or DEFAULT_TIMEZONE when that isn't a known IANA zone (new rows
+are validated; older ones may hold anything). scripts/backfill_daily_practice_stats.py
+rebuilds the table from scratch.
+"""
+import math
+from datetime import date, datetime, timezone
+from uuid import UUID
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Checkin, DailyPracticeStats, Sit
+
+# For rows logged without a timezone.
+DEFAULT_TIMEZONE = "America/Los_Angeles"
+
+
+def sit_minutes(duration_seconds: float) -> int:
+    """Whole minutes for one sit, half rounding up (the backfill's SQL does the same)."""
+    return math.floor(duration_seconds / 60 + 0.5)
+
+
+def known_timezone(tz_name: str) -> bool:
+    try:
+        ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def local_date(ts: datetime, tz_name: str | None) -> date:
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    if not tz_name or not known_timezone(tz_name):
+        tz_name = DEFAULT_TIMEZONE
+    return ts.astimezone(ZoneInfo(tz_name)).date()
+
+
+async def _apply(
+    session: AsyncSession, user_id: UUID, day: date,
+    minutes: int = 0, sits: int = 0, checkins: int = 0,
+) -> None:
+    stmt = insert(DailyPracticeStats).values(
+        user_id=user_id, local_date=day,
+        sit_minutes=minutes, sit_count=sits, checkin_count=checkins,
+        updated_at=datetime.now(timezone.utc),
+    )
+    await session.exec(stmt.on_conflict_do_update(
+        index_elements=["user_id", "local_date"],
+        set_={
+            "sit_minutes": DailyPracticeStats.sit_minutes + stmt.excluded.sit_minutes,
+            "sit_count": DailyPracticeStats.sit_count + stmt.excluded.sit_count,
+            "checkin_count": DailyPracticeStats.checkin_count + stmt.excluded.checkin_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ))
+
+
+async def sit_added(session: AsyncSession, sit: Sit) -> None:
+    await _apply(session, sit.user_id, local_date(sit.started_at, sit.timezone),
+                 minutes=sit_minutes(sit.duration_seconds), sits=1)
+
+
+async def sit_removed(session: AsyncSession, sit: Sit) -> None:
+    await _apply(session, sit.user_id, local_date(sit.started_at, sit.timezone),
+                 minutes=-sit_minutes(sit.duration_seconds), sits=-1)
+
+
+async def checkin_added(session: AsyncSession, checkin: Checkin) -> None:
+    await _apply(session, checkin.user_id, local_date(checkin.responded_at, checkin.timezone), checkins=1)
+
+
+async def checkin_removed(session: AsyncSession, checkin: Checkin) -> None:
+    await _apply(session, checkin.user_id, local_date(checkin.responded_at, checkin.timezone), checkins=-1)
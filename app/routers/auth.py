@@ -2,9 +2,11 @@ import re
 from uuid import UUID
 from pydantic import BaseModel, field_validator
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
-from app.auth import hash_password, verify_password, create_token, get_current_user
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
+from app.auth import create_token, get_current_user, invalidate_user
+from app.passwords import hash_password, verify_password, needs_rehash
 from app.models import User, Flow, Sit, Checkin, ChatMessage
 from app.default_flow import DEFAULT_FLOW_NAME, DEFAULT_FLOW_DESCRIPTION, DEFAULT_FLOW_STEPS
 
@@ -61,17 +63,17 @@ class AuthResponse(BaseModel):
 
 
 @router.post("/signup", response_model=AuthResponse)
-def signup(body: SignupRequest, session: Session = Depends(get_session)):
-    existing = session.exec(select(User).where(User.username == body.username)).first()
+async def signup(body: SignupRequest, session: AsyncSession = Depends(get_async_session)):
+    existing = (await session.exec(select(User).where(User.username == body.username))).first()
     if existing:
         raise HTTPException(status_code=409, detail="Username already taken")
 
     user = User(
         username=body.username,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password(body.password),
     )
     session.add(user)
-    session.flush()
+    await session.flush()
 
     # Create default flow
     flow = Flow(
@@ -81,11 +83,11 @@ def signup(body: SignupRequest, session: Session = Depends(get_session)):
         steps_json=DEFAULT_FLOW_STEPS,
     )
     session.add(flow)
-    session.flush()
+    await session.flush()
 
     user.current_flow_id = flow.id
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
 
     token = create_token(user.id)
     return AuthResponse(
@@ -95,11 +97,18 @@ def signup(body: SignupRequest, session: Session = Depends(get_session)):
 
 
 @router.post("/login", response_model=AuthResponse)
-def login(body: LoginRequest, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.username == body.username.lower())).first()
-    if not user or not verify_password(body.password, user.password_hash):
+async def login(body: LoginRequest, session: AsyncSession = Depends(get_async_session)):
+    user = (await session.exec(select(User).where(User.username == body.username.lower()))).first()
+    if not user or not await verify_password(body.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
+    # The plaintext is only in hand at login: upgrade hashes made at an old cost.
+    if needs_rehash(user.password_hash):
+        user.password_hash = await hash_password(body.password)
+        session.add(user)
+        await session.commit()
+        invalidate_user(user.id)
+
     token = create_token(user.id)
     return AuthResponse(
         token=token,
@@ -108,33 +117,35 @@ def login(body: LoginRequest, session: Session = Depends(get_session)):
 
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     body: ChangePasswordRequest,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    if not verify_password(body.current_password, user.password_hash):
+    if not await verify_password(body.current_password, user.password_hash):
         raise HTTPException(status_code=401, detail="Current password is incorrect")
-    user.password_hash = hash_password(body.new_password)
+    user.password_hash = await hash_password(body.new_password)
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
     return {"ok": True}
 
 
 @router.delete("/account")
-def delete_account(
+async def delete_account(
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     # Delete all user data
-    for msg in session.exec(select(ChatMessage).where(ChatMessage.user_id == user.id)):
-        session.delete(msg)
-    for sit in session.exec(select(Sit).where(Sit.user_id == user.id)):
-        session.delete(sit)
-    for checkin in session.exec(select(Checkin).where(Checkin.user_id == user.id)):
-        session.delete(checkin)
-    for flow in session.exec(select(Flow).where(Flow.user_id == user.id)):
-        session.delete(flow)
-    session.delete(user)
-    session.commit()
+    for msg in await session.exec(select(ChatMessage).where(ChatMessage.user_id == user.id)):
+        await session.delete(msg)
+    for sit in await session.exec(select(Sit).where(Sit.user_id == user.id)):
+        await session.delete(sit)
+    for checkin in await session.exec(select(Checkin).where(Checkin.user_id == user.id)):
+        await session.delete(checkin)
+    for flow in await session.exec(select(Flow).where(Flow.user_id == user.id)):
+        await session.delete(flow)
+    await session.delete(user)
+    await session.commit()
+    invalidate_user(user.id)
     return {"ok": True}
@@ -1,20 +1,31 @@
 import json
-import os
-from datetime import datetime
+import logging
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from typing import Optional
 from uuid import UUID
 from zoneinfo import ZoneInfo
 from pydantic import BaseModel
 import anthropic
+import sqlalchemy as sa
 from fastapi import APIRouter, Depends
-from sqlmodel import Session, select
-from app.db import get_session
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, text
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import practice_stats
+from app.clients import anthropic_client
+from app.db import async_session_maker, get_async_session
 from app.auth import get_current_user
-from app.models import User, Flow, Sit, Checkin, ChatMessage
+from app.models import User, Flow, Sit, Checkin, ChatMessage, DailyPracticeStats
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
+logger = logging.getLogger(__name__)
 
-ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+MODEL = "claude-sonnet-4-6"
+# Tool rounds before the model must answer with what it has.
+MAX_TOOL_ROUNDS = 8
 
 SYSTEM_PROMPT_TEMPLATE = """You are a meditation practice assistant for the Sit app.
 
@@ -38,9 +49,15 @@ Respond in plain text, don't use **markdown formatting**, but newlines and bulle
 
 Today's date is {today}. All timestamps in query results are in the user's local time ({timezone})."""
 
+# query_practice_data rows: which per-row fields the model may ask for, and the cap.
+RAW_FIELDS = {"duration_seconds", "flow", "answers", "transcription", "schedule_type"}
+RAW_DEFAULT_FIELDS = ["duration_seconds", "flow", "answers"]
+RAW_DEFAULT_LIMIT = 50
+RAW_MAX_LIMIT = 200
+
 QUERY_TOOL = {
     "name": "query_practice_data",
-    "description": "Query the user's meditation practice data. Returns sits (timed seated meditation with duration_seconds) and/or checkins (flow-based check-ins with steps and optional voice note transcriptions).",
+    "description": "Individual sits (timed seated meditation) and/or checkins (flow-based check-ins with the answers given and optional voice note transcriptions), newest first. Capped at `limit` rows; use query_practice_stats for totals, trends and streaks.",
     "input_schema": {
         "type": "object",
         "properties": {
@@ -57,10 +74,44 @@ QUERY_TOOL = {
                 "enum": ["sits", "checkins", "all"],
                 "description": "Type of practice data to query. 'sits' for timed meditation sessions, 'checkins' for flow-based check-ins, 'all' for both. Defaults to 'all'.",
             },
+            "fields": {
+                "type": "array",
+                "items": {"type": "string", "enum": sorted(RAW_FIELDS)},
+                "description": "Fields to return per row besides type and time. Defaults to duration_seconds, flow and answers; ask for transcription only when the words matter.",
+            },
+            "limit": {
+                "type": "integer",
+                "description": f"Maximum rows (default {RAW_DEFAULT_LIMIT}, at most {RAW_MAX_LIMIT}).",
+            },
         },
     },
 }
 
+STATS_TOOL = {
+    "name": "query_practice_stats",
+    "description": "Aggregates computed in the database: minutes sat, sit count, average sit length, days practiced and check-in count, grouped by day, week, month, or none (one overall total); or check-in counts by flow or by answer given (flow, step, answer label). Always includes sit streaks (current and longest run of consecutive days with a sit). Cheap over any date range.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "group_by": {
+                "type": "string",
+                "enum": ["day", "week", "month", "none", "flow", "answer"],
+                "description": "Grouping. Defaults to 'none'.",
+            },
+            "start_date": {
+                "type": "string",
+                "description": "First local date (ISO format, e.g. 2026-01-01). Optional.",
+            },
+            "end_date": {
+                "type": "string",
+                "description": "Last local date, inclusive (ISO format). Optional.",
+            },
+        },
+    },
+}
+
+TOOLS = [STATS_TOOL, QUERY_TOOL]
+
 
 class ChatRequest(BaseModel):
     message: str
@@ -74,215 +125,407 @@ class ChatMessageResponse(BaseModel):
     created_at: datetime
 
 
-def query_practice_data(
+def _local_range(tz: ZoneInfo, start_date: Optional[str], end_date: Optional[str]):
+    """UTC bounds for [start_date, end_date] as local dates; either may be None."""
+    start = datetime.fromisoformat(start_date).replace(tzinfo=tz) if start_date else None
+    end = (datetime.fromisoformat(end_date) + timedelta(days=1)).replace(tzinfo=tz) if end_date else None
+    return start, end
+
+
+def _answer_labels(steps: Optional[list], flow: Optional[Flow]) -> list[dict]:
+    """A checkin's [step_id, answer_index] pairs as step titles and answer labels."""
+    if not steps or not flow or not isinstance(flow.steps_json, list):
+        return []
+    by_id = {str(s.get("id")): s for s in flow.steps_json}
+    answers = []
+    for pair in steps:
+        if not isinstance(pair, list) or len(pair) != 2:
+            continue
+        step_id, answer_idx = pair
+        step = by_id.get(str(step_id))
+        if not step:
+            continue
+        options = step.get("answers") or []
+        label = options[answer_idx].get("label") \
+            if isinstance(answer_idx, int) and 0 <= answer_idx < len(options) else None
+        answers.append({"step": step.get("title"), "answer": label})
+    return answers
+
+
+async def query_practice_data(
     user_id: UUID,
-    session: Session,
+    session: AsyncSession,
     tz: ZoneInfo,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
     type: Optional[str] = "all",
+    fields: Optional[list[str]] = None,
+    limit: Optional[int] = None,
 ) -> dict:
-    results = []
+    fields = set(fields or RAW_DEFAULT_FIELDS) & RAW_FIELDS
+    limit = max(1, min(limit or RAW_DEFAULT_LIMIT, RAW_MAX_LIMIT))
+    start, end = _local_range(tz, start_date, end_date)
+    rows: list[tuple[datetime, dict]] = []
+    truncated = False
+
+    if type in ("sits", "all", None):
+        stmt = select(Sit).where(Sit.user_id == user_id)
+        if start:
+            stmt = stmt.where(Sit.started_at >= start)
+        if end:
+            stmt = stmt.where(Sit.started_at < end)
+        sits = (await session.exec(stmt.order_by(Sit.started_at.desc()).limit(limit + 1))).all()
+        truncated |= len(sits) > limit
+        for s in sits[:limit]:
+            row = {"type": "sit"}
+            if "duration_seconds" in fields:
+                row["duration_seconds"] = s.duration_seconds
+            rows.append((s.started_at, row))
+
+    if type in ("checkins", "all", None):
+        stmt = select(Checkin).where(Checkin.user_id == user_id)
+        if start:
+            stmt = stmt.where(Checkin.responded_at >= start)
+        if end:
+            stmt = stmt.where(Checkin.responded_at < end)
+        checkins = (await session.exec(stmt.order_by(Checkin.responded_at.desc()).limit(limit + 1))).all()
+        truncated |= len(checkins) > limit
+        checkins = checkins[:limit]
 
-    include_sits = type in ("sits", "all", None)
-    include_checkins = type in ("checkins", "all", None)
-
-    if include_sits:
-        sit_stmt = (
-            select(Sit).where(Sit.user_id == user_id).order_by(Sit.started_at.desc())
-        )
-        if start_date:
-            local_start = datetime.fromisoformat(start_date).replace(tzinfo=tz)
-            sit_stmt = sit_stmt.where(
-                Sit.started_at
-                >= local_start.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
-            )
-        if end_date:
-            local_end = datetime.fromisoformat(end_date).replace(
-                hour=23, minute=59, second=59, tzinfo=tz
-            )
-            sit_stmt = sit_stmt.where(
-                Sit.started_at
-                <= local_end.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
-            )
-        sits = session.exec(sit_stmt).all()
-        for s in sits:
-            local_time = (
-                s.started_at.replace(tzinfo=ZoneInfo("UTC")).astimezone(tz).isoformat()
-            )
-            results.append(
-                {
-                    "type": "sit",
-                    "time": local_time,
-                    "duration_seconds": s.duration_seconds,
-                }
-            )
-
-    if include_checkins:
-        checkin_stmt = (
-            select(Checkin)
-            .where(Checkin.user_id == user_id)
-            .order_by(Checkin.responded_at.desc())
-        )
-        if start_date:
-            local_start = datetime.fromisoformat(start_date).replace(tzinfo=tz)
-            checkin_stmt = checkin_stmt.where(
-                Checkin.responded_at
-                >= local_start.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
-            )
-        if end_date:
-            local_end = datetime.fromisoformat(end_date).replace(
-                hour=23, minute=59, second=59, tzinfo=tz
-            )
-            checkin_stmt = checkin_stmt.where(
-                Checkin.responded_at
-                <= local_end.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
-            )
-        checkins = session.exec(checkin_stmt).all()
-
-        # Batch-fetch flow definitions
         flow_ids = {c.flow_id for c in checkins if c.flow_id}
-        flows = (
-            session.exec(select(Flow).where(Flow.id.in_(flow_ids))).all()
-            if flow_ids
-            else []
-        )
-        flows_map = {str(f.id): {"name": f.name, "steps": f.steps_json} for f in flows}
-
+        flows = {
+            f.id: f for f in (await session.exec(select(Flow).where(Flow.id.in_(flow_ids)))).all()
+        } if flow_ids and fields & {"flow", "answers"} else {}
         for c in checkins:
-            local_time = (
-                c.responded_at.replace(tzinfo=ZoneInfo("UTC"))
-                .astimezone(tz)
-                .isoformat()
-            )
-            results.append(
-                {
-                    "type": "checkin",
-                    "time": local_time,
-                    "flow_id": str(c.flow_id) if c.flow_id else None,
-                    "steps": c.steps,
-                    "transcription": c.transcription,
-                }
-            )
+            flow = flows.get(c.flow_id)
+            row = {"type": "checkin"}
+            if "flow" in fields:
+                row["flow"] = flow.name if flow else None
+            if "answers" in fields:
+                row["answers"] = _answer_labels(c.steps, flow)
+            if "transcription" in fields:
+                row["transcription"] = c.transcription
+            if "schedule_type" in fields:
+                row["schedule_type"] = c.schedule_type
+            rows.append((c.responded_at, row))
+
+    # Merge newest first, then keep the overall cap.
+    rows.sort(key=lambda r: r[0], reverse=True)
+    truncated |= len(rows) > limit
+    return {
+        "responses": [
+            {**row, "time": ts.astimezone(tz).isoformat()} for ts, row in rows[:limit]
+        ],
+        "returned": min(len(rows), limit),
+        "truncated": truncated,
+    }
+
+
+# Checkins grouped by (flow, step, answer label): each [step_id, answer_index]
+# pair in checkins.steps is resolved against the flow's steps_json. As in
+# _answer_labels, an index that isn't a non-negative integer gives no label
+# (the CASE keeps the cast from ever seeing one).
+ANSWER_COUNTS_SQL = """
+    SELECT f.name AS flow, fs->>'title' AS step,
+           fs->'answers'->(CASE WHEN jsonb_typeof(st->1) = 'number' AND st->>1 ~ '^[0-9]{{1,9}}$'
+                                THEN (st->>1)::int END)->>'label' AS answer,
+           count(*) AS checkins
+    FROM checkins c
+    JOIN flows f ON f.id = c.flow_id
+    CROSS JOIN LATERAL jsonb_array_elements(CASE jsonb_typeof(c.steps) WHEN 'array' THEN c.steps ELSE '[]' END) st
+    CROSS JOIN LATERAL jsonb_array_elements(CASE jsonb_typeof(f.steps_json) WHEN 'array' THEN f.steps_json ELSE '[]' END) fs
+    WHERE c.user_id = :user_id AND fs->>'id' = st->>0 {range}
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 4 DESC
+"""
+
+FLOW_COUNTS_SQL = """
+    SELECT coalesce(f.name, '(no flow)') AS flow, count(*) AS checkins,
+           count(c.voice_note_s3_url) AS voice_notes
+    FROM checkins c
+    LEFT JOIN flows f ON f.id = c.flow_id
+    WHERE c.user_id = :user_id {range}
+    GROUP BY 1
+    ORDER BY 2 DESC
+"""
+
+# Checkin local date, as in the daily rollup. The responded_at bounds (a day of
+# slack each side for timezones) let the (user_id, responded_at) index narrow
+# the scan before the exact local-date test.
+CHECKIN_RANGE_SQL = """
+    AND (CAST(:start AS date) IS NULL OR (c.responded_at >= CAST(:start AS date) - 1
+         AND CAST(c.responded_at AT TIME ZONE coalesce(c.timezone, :default_tz) AS date) >= CAST(:start AS date)))
+    AND (CAST(:end AS date) IS NULL OR (c.responded_at < CAST(:end AS date) + 2
+         AND CAST(c.responded_at AT TIME ZONE coalesce(c.timezone, :default_tz) AS date) <= CAST(:end AS date)))
+"""
+
+STREAKS_SQL = """
+    SELECT min(local_date) AS first_day, max(local_date) AS last_day, count(*) AS days
+    FROM (
+        SELECT local_date, local_date - (row_number() OVER (ORDER BY local_date))::int AS island
+        FROM daily_practice_stats
+        WHERE user_id = :user_id AND sit_count > 0
+    ) days
+    GROUP BY island
+"""
+
+
+async def _sit_streaks(user_id: UUID, session: AsyncSession, today: date) -> dict:
+    runs = (await session.exec(text(STREAKS_SQL), params={"user_id": user_id})).all()
+    longest = max(runs, key=lambda r: (r.days, r.last_day), default=None)
+    # A run that ended yesterday still counts as current: today's sit may be ahead.
+    current = next((r for r in runs if r.last_day >= today - timedelta(days=1)), None)
+    return {
+        "current_days": current.days if current else 0,
+        "longest_days": longest.days if longest else 0,
+        "longest_from": longest.first_day.isoformat() if longest else None,
+        "longest_to": longest.last_day.isoformat() if longest else None,
+    }
+
+
+async def query_practice_stats(
+    user_id: UUID,
+    session: AsyncSession,
+    tz: ZoneInfo,
+    group_by: Optional[str] = "none",
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> dict:
+    group_by = group_by or "none"
+    start = date.fromisoformat(start_date) if start_date else None
+    end = date.fromisoformat(end_date) if end_date else None
+
+    if group_by in ("flow", "answer"):
+        sql = (FLOW_COUNTS_SQL if group_by == "flow" else ANSWER_COUNTS_SQL).format(range=CHECKIN_RANGE_SQL)
+        result = await session.exec(text(sql), params={
+            "user_id": user_id, "start": start, "end": end, "default_tz": practice_stats.DEFAULT_TIMEZONE,
+        })
+        groups = [dict(row._mapping) for row in result.all()]
     else:
-        flows_map = {}
+        day = DailyPracticeStats.local_date
+        bucket = {
+            "day": day,
+            "week": sa.cast(func.date_trunc("week", day), sa.Date),
+            "month": sa.cast(func.date_trunc("month", day), sa.Date),
+            "none": None,
+        }[group_by]
+        minutes = func.sum(DailyPracticeStats.sit_minutes)
+        sits = func.sum(DailyPracticeStats.sit_count)
+        columns = [
+            minutes.label("sit_minutes"),
+            sits.label("sits"),
+            func.round(sa.cast(minutes, sa.Numeric) / func.nullif(sits, 0), 1).label("avg_sit_minutes"),
+            func.count().filter(DailyPracticeStats.sit_count > 0).label("days_with_sits"),
+            func.sum(DailyPracticeStats.checkin_count).label("checkins"),
+        ]
+        stmt = select(*([bucket.label("period")] if bucket is not None else []), *columns) \
+            .where(DailyPracticeStats.user_id == user_id)
+        if start:
+            stmt = stmt.where(day >= start)
+        if end:
+            stmt = stmt.where(day <= end)
+        if bucket is not None:
+            stmt = stmt.group_by(bucket).order_by(bucket)
+        groups = [
+            {k: (v.isoformat() if isinstance(v, date) else float(v) if isinstance(v, Decimal) else v)
+             for k, v in row._mapping.items()}
+            for row in (await session.exec(stmt)).all()
+        ]
+    return {
+        "group_by": group_by,
+        "groups": groups,
+        "sit_streaks": await _sit_streaks(user_id, session, datetime.now(tz).date()),
+    }
+
+
+async def run_tool(name: str, args: dict, user_id: UUID, session: AsyncSession, tz: ZoneInfo) -> dict:
+    if name == "query_practice_stats":
+        return await query_practice_stats(
+            user_id, session, tz,
+            args.get("group_by"), args.get("start_date"), args.get("end_date"),
+        )
+    return await query_practice_data(
+        user_id,
+        session,
+        tz,
+        args.get("start_date"),
+        args.get("end_date"),
+        args.get("type", "all"),
+        args.get("fields"),
+        args.get("limit"),
+    )
 
-    # Sort merged results by time descending
-    results.sort(key=lambda r: r["time"], reverse=True)
 
+def serialize_chat_message(msg: ChatMessage) -> dict:
     return {
-        "flows": flows_map,
-        "responses": results,
-        "total_count": len(results),
+        "id": str(msg.id),
+        "role": msg.role,
+        "content": msg.content,
+        "created_at": msg.created_at.isoformat(),
     }
 
 
-@router.post("")
-def chat(
-    body: ChatRequest,
-    user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+async def chat_turn_events(
+    user_id: UUID, tz_name: str, session: AsyncSession, client: anthropic.AsyncAnthropic,
 ):
-    tz = ZoneInfo(body.timezone)
-    now_local = datetime.now(tz)
+    """Answer the newest user message (already saved), running tools for as many
+    rounds as the model asks, and yield events as they happen — the morning
+    router's format:
+      {"type": "text", "delta": str}                              — assistant tokens
+      {"type": "tool_pending", "name": str, "tool_use_id": str}   — model started a tool call
+      {"type": "tool", "tool_use_id": str, "name": str, "input": dict}  — tool about to run
+      {"type": "tool_done", "tool_use_id": str, "name": str}      — tool ran
+      {"type": "done", "messages": [dict], "timing": dict}        — last, on success
+    """
+    started = time.monotonic()
+    first_token_at = None
+    tz = ZoneInfo(tz_name)
     system_prompt = SYSTEM_PROMPT_TEMPLATE.format(
-        today=now_local.strftime("%A, %B %-d, %Y"),
-        timezone=body.timezone,
+        today=datetime.now(tz).strftime("%A, %B %-d, %Y"),
+        timezone=tz_name,
     )
 
-    # Save user message
-    user_msg = ChatMessage(user_id=user.id, role="user", content=body.message)
-    session.add(user_msg)
-    session.flush()
-
     # Load recent history for context
-    history = session.exec(
+    history = (await session.exec(
         select(ChatMessage)
-        .where(ChatMessage.user_id == user.id)
+        .where(ChatMessage.user_id == user_id)
         .order_by(ChatMessage.created_at.desc())
         .limit(20)
-    ).all()
+    )).all()
     history.reverse()
+    messages = [{"role": msg.role, "content": msg.content} for msg in history]
 
-    messages = []
-    for msg in history:
-        messages.append({"role": msg.role, "content": msg.content})
-
-    client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
-    response = client.messages.create(
-        model="claude-sonnet-4-6",
-        max_tokens=1024,
-        system=system_prompt,
-        messages=messages,
-        tools=[QUERY_TOOL],
-    )
+    assistant_content = ""
+    rounds = 0
+    while True:
+        rounds += 1
+        async with client.messages.stream(
+            model=MODEL,
+            max_tokens=1024,
+            system=system_prompt,
+            messages=messages,
+            tools=TOOLS,
+            # Past the round cap, force a plain-text answer from what's gathered.
+            tool_choice={"type": "auto" if rounds <= MAX_TOOL_ROUNDS else "none"},
+        ) as stream:
+            async for event in stream:
+                if event.type == "content_block_delta" and event.delta.type == "text_delta":
+                    if first_token_at is None:
+                        first_token_at = time.monotonic()
+                    yield {"type": "text", "delta": event.delta.text}
+                elif event.type == "content_block_start" \
+                        and event.content_block.type == "tool_use":
+                    yield {
+                        "type": "tool_pending", "name": event.content_block.name,
+                        "tool_use_id": event.content_block.id,
+                    }
+            response = await stream.get_final_message()
 
-    # Handle tool use
-    if response.stop_reason == "tool_use":
-        # Build assistant message with all content blocks
-        messages.append({"role": "assistant", "content": response.content})
+        assistant_content += "".join(block.text for block in response.content if block.type == "text")
+        if response.stop_reason != "tool_use":
+            break
 
+        messages.append({"role": "assistant", "content": response.content})
         tool_results = []
         for block in response.content:
-            if block.type == "tool_use":
-                args = block.input
-                result = query_practice_data(
-                    user.id,
-                    session,
-                    tz,
-                    args.get("start_date"),
-                    args.get("end_date"),
-                    args.get("type", "all"),
-                )
-                tool_results.append(
-                    {
-                        "type": "tool_result",
-                        "tool_use_id": block.id,
-                        "content": json.dumps(result),
-                    }
-                )
-
+            if block.type != "tool_use":
+                continue
+            yield {"type": "tool", "tool_use_id": block.id, "name": block.name, "input": block.input}
+            # A failure (bad model-supplied arguments, a failed query) becomes the
+            # tool's result, so the model can carry on without it.
+            try:
+                result = await run_tool(block.name, block.input, user_id, session, tz)
+                content, is_error = json.dumps(result), False
+            except Exception as e:
+                logger.exception("Chat tool %s failed", block.name)
+                # A failed query leaves the transaction aborted; the user's message
+                # is already committed.
+                await session.rollback()
+                content, is_error = f"(Tool failed: {e!r})", True
+            yield {"type": "tool_done", "tool_use_id": block.id, "name": block.name}
+            tool_results.append({
+                "type": "tool_result",
+                "tool_use_id": block.id,
+                "content": content,
+                "is_error": is_error,
+            })
         messages.append({"role": "user", "content": tool_results})
 
-        response = client.messages.create(
-            model="claude-sonnet-4-6",
-            max_tokens=1024,
-            system=system_prompt,
-            messages=messages,
-            tools=[QUERY_TOOL],
-        )
-
-    assistant_content = ""
-    for block in response.content:
-        if hasattr(block, "text"):
-            assistant_content += block.text
-
-    # Save assistant message
-    assistant_msg = ChatMessage(
-        user_id=user.id, role="assistant", content=assistant_content
-    )
+    assistant_msg = ChatMessage(user_id=user_id, role="assistant", content=assistant_content)
     session.add(assistant_msg)
-    session.commit()
-    session.refresh(assistant_msg)
+    await session.commit()
+    await session.refresh(assistant_msg)
 
-    return {
-        "id": str(assistant_msg.id),
-        "role": assistant_msg.role,
-        "content": assistant_msg.content,
-        "created_at": assistant_msg.created_at.isoformat(),
+    timing = {
+        "first_token_ms": round((first_token_at - started) * 1000) if first_token_at else None,
+        "total_ms": round((time.monotonic() - started) * 1000),
+        "rounds": rounds,
     }
+    logger.info(
+        "Chat turn: first_token=%sms total=%dms rounds=%d",
+        timing["first_token_ms"], timing["total_ms"], rounds,
+    )
+    yield {"type": "done", "messages": [serialize_chat_message(assistant_msg)], "timing": timing}
+
+
+async def save_user_message(user: User, body: ChatRequest, session: AsyncSession) -> None:
+    session.add(ChatMessage(user_id=user.id, role="user", content=body.message))
+    await session.commit()
+
+
+@router.post("")
+async def chat(
+    body: ChatRequest,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    client: anthropic.AsyncAnthropic = Depends(anthropic_client),
+):
+    await save_user_message(user, body, session)
+    async for event in chat_turn_events(user.id, body.timezone, session, client):
+        pass
+    return event["messages"][0]
+
+
+@router.post("/stream")
+async def chat_stream(
+    body: ChatRequest,
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+    client: anthropic.AsyncAnthropic = Depends(anthropic_client),
+):
+    """Server-sent events for one chat turn: text deltas and tool calls as they
+    happen, then a "done" event with the saved assistant message."""
+    await save_user_message(user, body, session)
+    user_id = user.id
+
+    async def sse():
+        # The request-scoped session is torn down before a StreamingResponse body
+        # runs, so the generator opens its own.
+        try:
+            async with async_session_maker() as stream_session:
+                async for event in chat_turn_events(user_id, body.timezone, stream_session, client):
+                    yield "data: " + json.dumps(event) + "\n\n"
+        except Exception:
+            logger.exception("Chat turn failed")
+            yield "data: " + json.dumps({"type": "error", "message": "The turn failed"}) + "\n\n"
+
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/history", response_model=list[ChatMessageResponse])
-def get_chat_history(
+async def get_chat_history(
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    messages = session.exec(
+    messages = (await session.exec(
         select(ChatMessage)
         .where(ChatMessage.user_id == user.id)
         .order_by(ChatMessage.created_at.desc())
         .limit(50)
-    ).all()
+    )).all()
     messages.reverse()
     return messages
@@ -2,9 +2,10 @@ from typing import Optional
 from uuid import UUID
 from pydantic import BaseModel
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
-from app.auth import get_current_user
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
+from app.auth import get_current_user, invalidate_user
 from app.models import User, Flow
 
 router = APIRouter(prefix="/api/explore", tags=["explore"])
@@ -19,12 +20,12 @@ class PublicFlowResponse(BaseModel):
 
 
 @router.get("/flows", response_model=list[PublicFlowResponse])
-def list_public_flows(session: Session = Depends(get_session)):
-    rows = session.exec(
+async def list_public_flows(session: AsyncSession = Depends(get_async_session)):
+    rows = (await session.exec(
         select(User, Flow)
         .join(Flow, User.current_flow_id == Flow.id)
         .where(Flow.visibility == "public")
-    ).all()
+    )).all()
     return [
         PublicFlowResponse(
             username=user.username,
@@ -38,16 +39,16 @@ def list_public_flows(session: Session = Depends(get_session)):
 
 
 @router.post("/use/{username}")
-def use_flow(
+async def use_flow(
     username: str,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    source_user = session.exec(select(User).where(User.username == username)).first()
+    source_user = (await session.exec(select(User).where(User.username == username))).first()
     if not source_user or not source_user.current_flow_id:
         raise HTTPException(status_code=404, detail="User or flow not found")
 
-    source_flow = session.get(Flow, source_user.current_flow_id)
+    source_flow = await session.get(Flow, source_user.current_flow_id)
     if not source_flow or source_flow.visibility != "public":
         raise HTTPException(status_code=404, detail="Flow not found or not public")
 
@@ -61,10 +62,11 @@ def use_flow(
         source_flow_name=source_flow.name,
     )
     session.add(new_flow)
-    session.flush()
+    await session.flush()
 
     user.current_flow_id = new_flow.id
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
 
     return {"ok": True, "flow_id": str(new_flow.id)}
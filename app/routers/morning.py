@@ -3,29 +3,48 @@ ask the Rigdzin NotebookLM notebook, and write/update a wake-up log journal entr
 
 No auth: this router is only reachable over Tailscale (the public vhost 404s it).
 """
+import asyncio
 import json
+import logging
+import math
 import os
-import subprocess
+import time
 from datetime import date, datetime, timedelta, timezone as tz
-from typing import Optional
+from typing import Awaitable, Optional
 from uuid import UUID
 from zoneinfo import ZoneInfo
 
 import anthropic
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
-from sqlmodel import Session, select
-
-from app import journal
-from app.db import engine, get_session
-from app.models import MorningMessage, MorningSession, Sit, User
+from pydantic import BaseModel, field_validator
+import sqlalchemy as sa
+from sqlalchemy import func
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import journal, notebooklm, practice_stats, turns
+from app.clients import anthropic_client
+from app.db import async_session_maker, get_async_session
+from app.models import DailyPracticeStats, DeletedPromptResponse, MorningMessage, MorningSession, Sit, User
+from app.pagination import decode_cursor, encode_cursor
 
 router = APIRouter(prefix="/api/morning", tags=["morning"])
+logger = logging.getLogger(__name__)
 
 MODEL = "claude-fable-5"
+SUMMARY_MODEL = "claude-sonnet-4-6"
 MORNING_USERNAME = os.getenv("MORNING_USERNAME", "jasoncbenn")
-NOTEBOOKLM_BIN = os.getenv("NOTEBOOKLM_BIN", "notebooklm")
+# Background tool calls (NotebookLM queries) running at once across all turns.
+TOOL_CONCURRENCY = int(os.getenv("MORNING_TOOL_CONCURRENCY", "4"))
+TOOL_HEARTBEAT_SECONDS = 5
+# History (summary + replayed messages) allowed per request; compaction keeps
+# the newest CONTEXT_KEEP_TOKENS verbatim and summarizes the rest.
+CONTEXT_BUDGET_TOKENS = int(os.getenv("MORNING_CONTEXT_BUDGET_TOKENS", "30000"))
+CONTEXT_KEEP_TOKENS = CONTEXT_BUDGET_TOKENS // 2
+CHARS_PER_TOKEN = 3.5
+SUMMARY_MAX_TOKENS = 2000
+_tool_slots = asyncio.Semaphore(TOOL_CONCURRENCY)
 
 SYSTEM_PROMPT = """You are the morning sit companion in the Sit app. Each session is a \
 brief check-in around one seated meditation: the user shares what's alive before sitting, \
@@ -76,6 +95,14 @@ question or observation is worth keeping. Capture what was alive and where the t
 off; don't claim a sit or an outcome that isn't in the conversation, and skip the \
 "N-min sit:" title format. Then reply with one short closing line.)"""
 
+SUMMARY_PROMPT = """You compress the earlier part of a morning meditation check-in \
+conversation so it can continue with less context. Write a faithful summary in plain \
+text: what the user shared and asked, the intention they set, any sit and what they \
+reported after it, what the notebook said when consulted, and where a journal entry was \
+written. Keep the user's own key phrases verbatim. No preamble."""
+
+SUMMARY_PREAMBLE = "(Earlier in this session, summarized:)\n"
+
 TOOLS = [
     {
         "name": "ask_notebooklm",
@@ -110,8 +137,8 @@ class NewSessionRequest(BaseModel):
     timezone: str = "America/Los_Angeles"
 
 
-def get_user(session: Session) -> User:
-    return session.exec(select(User).where(User.username == MORNING_USERNAME)).one()
+async def get_user(session: AsyncSession) -> User:
+    return (await session.exec(select(User).where(User.username == MORNING_USERNAME))).one()
 
 
 def serialize_message(m: MorningMessage) -> dict:
@@ -133,8 +160,9 @@ def serialize_session(s: MorningSession, message_count: int) -> dict:
     }
 
 
-def build_system_prompt(morning: MorningSession, user_tz: ZoneInfo) -> str:
-    entries = journal.read_entries(limit=3)
+async def build_system_prompt(morning: MorningSession, user_tz: ZoneInfo) -> str:
+    # Journal reads are file I/O; keep them off the event loop.
+    entries = await asyncio.to_thread(journal.read_entries, limit=3)
     rendered = "\n\n".join(f"### {e['date']} {e['title']}\n{e['body'].strip()}" for e in entries)
     prompt = SYSTEM_PROMPT.format(
         today=datetime.now(user_tz).strftime("%A, %B %-d, %Y"),
@@ -143,15 +171,18 @@ def build_system_prompt(morning: MorningSession, user_tz: ZoneInfo) -> str:
     if morning.journal_heading:
         prompt += "\n\n" + UPDATE_CONTEXT.format(
             heading=morning.journal_heading,
-            body=journal.read_entry(morning.journal_heading),
+            body=await asyncio.to_thread(journal.read_entry, morning.journal_heading),
         )
     return prompt
 
 
-def build_api_messages(db_messages: list[MorningMessage]) -> list[dict]:
+def build_api_messages(db_messages: list[MorningMessage], summary: Optional[str] = None) -> list[dict]:
     """Flatten stored messages into API turns; tool events become inline markers so the
-    model can see where in the conversation the entry was written."""
+    model can see where in the conversation the entry was written. A summary of
+    earlier, compacted messages opens the conversation."""
     api = []
+    if summary:
+        api.append({"role": "user", "content": SUMMARY_PREAMBLE + summary})
     for m in db_messages:
         if m.role == "tool":
             content = f"[{m.tool_label}: {m.content}]"
@@ -171,84 +202,184 @@ def build_api_messages(db_messages: list[MorningMessage]) -> list[dict]:
     return api
 
 
-def ask_notebooklm(question: str) -> str:
-    result = subprocess.run(
-        [NOTEBOOKLM_BIN, "ask", "--json", question],
-        capture_output=True, text=True, timeout=180,
+def estimate_tokens(text: str) -> int:
+    """Conservative token estimate for budgeting; English prose runs ~4 chars/token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + 4
+
+
+def message_tokens(m: MorningMessage) -> int:
+    return estimate_tokens(m.content) + (estimate_tokens(m.tool_label) if m.tool_label else 0)
+
+
+async def summarize_span(
+    client: anthropic.AsyncAnthropic, summary: Optional[str], span: list[MorningMessage],
+) -> str:
+    """Fold a span of messages (and the summary of what preceded it) into one summary."""
+    transcript = "\n\n".join(
+        f"{turn['role'].capitalize()}: {turn['content']}" for turn in build_api_messages(span)
     )
-    if result.returncode != 0:
-        return f"(NotebookLM query failed: {result.stderr.strip()[-500:]})"
-    return json.loads(result.stdout)["answer"]
+    if summary:
+        transcript = f"Summary so far:\n{summary}\n\nContinuation:\n{transcript}"
+    response = await client.messages.create(
+        model=SUMMARY_MODEL,
+        max_tokens=SUMMARY_MAX_TOKENS,
+        system=SUMMARY_PROMPT,
+        messages=[{"role": "user", "content": transcript}],
+    )
+    return "".join(block.text for block in response.content if block.type == "text").strip()
+
+
+async def build_context(
+    morning: MorningSession, db_messages: list[MorningMessage],
+    client: anthropic.AsyncAnthropic, session: AsyncSession,
+) -> list[dict]:
+    """API messages for the session, held within CONTEXT_BUDGET_TOKENS. Once the
+    history outgrows the budget, everything but the newest CONTEXT_KEEP_TOKENS
+    is folded into the session's stored summary, so the next several turns reuse
+    it (and its prompt-cache prefix) before another compaction is needed."""
+    summary = morning.context_summary
+    tail = db_messages
+    if summary:
+        ids = [m.id for m in db_messages]
+        if morning.context_summary_through in ids:
+            tail = db_messages[ids.index(morning.context_summary_through) + 1:]
+        else:
+            summary = None  # summarized messages are gone; start over
+
+    sizes = [message_tokens(m) for m in tail]
+    if len(tail) > 1 and (estimate_tokens(summary) if summary else 0) + sum(sizes) > CONTEXT_BUDGET_TOKENS:
+        keep_from, kept = len(tail), 0
+        while keep_from > 1 and kept + sizes[keep_from - 1] <= CONTEXT_KEEP_TOKENS:
+            keep_from -= 1
+            kept += sizes[keep_from]
+        keep_from = min(keep_from, len(tail) - 1)  # always summarize something
+        span, tail = tail[:keep_from], tail[keep_from:]
+        summary = await summarize_span(client, summary, span)
+        morning.context_summary = summary
+        morning.context_summary_through = span[-1].id
+        session.add(morning)
+        logger.info(
+            "Morning session %s: compacted %d messages (~%d tokens) into a summary",
+            morning.id, len(span), sum(sizes[:keep_from]),
+        )
+    return build_api_messages(tail, summary)
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
+def cached_system(system_prompt: str) -> list[dict]:
+    """System prompt as a cache breakpoint: tools + system are the stable prefix
+    of every request in a session."""
+    return [{"type": "text", "text": system_prompt, "cache_control": CACHE_CONTROL}]
 
-def write_journal(
+
+def cached_messages(api_messages: list[dict]) -> list[dict]:
+    """Copy of api_messages with a cache breakpoint on the final block. Each tool-loop
+    iteration (and the next turn) re-sends this history plus a little more, so it
+    reads the prefix from cache instead of paying for it again. Only the copy is
+    marked, keeping the one moving breakpoint under the API's limit of four."""
+    if not api_messages:
+        return api_messages
+    *head, last = api_messages
+    content = last["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    elif content and isinstance(content[-1], dict):
+        content = list(content)
+    else:
+        return api_messages
+    content[-1] = {**content[-1], "cache_control": CACHE_CONTROL}
+    return head + [{**last, "content": content}]
+
+
+async def run_tool(call: Awaitable[str]) -> str:
+    """Run one backgrounded tool call under the shared concurrency limit. A failure
+    becomes the tool's result text, so the model can carry on without it."""
+    async with _tool_slots:
+        try:
+            return await call
+        except Exception as e:
+            logger.exception("Morning tool call failed")
+            return f"(Tool failed: {e!r})"
+
+
+async def write_journal(
     morning: MorningSession, title: str, body: str,
-    user_tz: ZoneInfo, session: Session, entry_date: Optional[date] = None,
+    user_tz: ZoneInfo, session: AsyncSession, entry_date: Optional[date] = None,
 ) -> str:
     """Write or overwrite the session's entry. Returns the tool_label for the UI chip.
     Sits are logged separately, by the explicit add-sit button."""
     heading = journal.make_heading(title, entry_date or datetime.now(user_tz).date())
     if morning.journal_heading:
-        journal.update_entry(morning.journal_heading, heading, body)
+        await asyncio.to_thread(journal.update_entry, morning.journal_heading, heading, body)
         morning.journal_heading = heading
         session.add(morning)
         return "Updated journal entry → Wake up.md"
 
-    journal.write_entry(heading, body)
+    await asyncio.to_thread(journal.write_entry, heading, body)
     morning.journal_heading = heading
     morning.journal_written_at = datetime.now(tz.utc)
     session.add(morning)
     return "Wrote journal entry → Wake up.md"
 
 
-def agent_turn_events(
-    morning: MorningSession, user: User,
-    user_tz: ZoneInfo, session: Session, greeting: bool = False, closing: bool = False,
+async def agent_turn_events(
+    morning: MorningSession, user: User, user_tz: ZoneInfo, session: AsyncSession,
+    client: anthropic.AsyncAnthropic, greeting: bool = False, closing: bool = False,
 ):
     """Run the model (with tool loop) over the session's stored messages, persist
     everything new, and yield progress events as they happen:
       {"type": "text", "delta": str}          — assistant tokens
-      {"type": "tool_pending", "name": str}   — model started emitting a tool call
-      {"type": "tool", ...}                   — tool about to run (label + input known)
-      {"type": "tool_done", "message": dict}  — tool ran; persisted chip message
+      {"type": "tool_pending", "name": str, "tool_use_id": str}  — model started a tool call
+      {"type": "tool", "tool_use_id": str, ...}  — tool about to run (label + input known)
+      {"type": "tool_progress", "running": [...]}  — every few seconds while tools run
+      {"type": "tool_done", "tool_use_id": str, "message": dict}  — tool ran; persisted chip
       {"type": "done", "messages": [...], "journal_written": bool}  — always last
     closing mode (abandoned thread): the entry is dated to the session's day."""
-    db_messages = session.exec(
+    db_messages = (await session.exec(
         select(MorningMessage)
         .where(MorningMessage.session_id == morning.id)
         .order_by(MorningMessage.created_at)
-    ).all()
-    api_messages = build_api_messages(db_messages)
+    )).all()
+    api_messages = await build_context(morning, db_messages, client, session)
     if greeting:
         api_messages.append({"role": "user", "content": GREETING_INSTRUCTION})
     if closing:
         api_messages.append({"role": "user", "content": CLOSING_INSTRUCTION})
 
-    system_prompt = build_system_prompt(morning, user_tz)
-    client = anthropic.Anthropic()
+    system_prompt = await build_system_prompt(morning, user_tz)
     new_messages: list[MorningMessage] = []
     journal_written = False
+    usage = {"input": 0, "cache_read": 0, "cache_write": 0, "output": 0}
 
     for _ in range(6):
         # Fable: thinking is always on and counts toward max_tokens; fallbacks
         # reroute a safety refusal to Opus server-side so a turn never comes
         # back empty (extra_body: the 0.125 SDK has no typed fallbacks param).
-        with client.beta.messages.stream(
+        async with client.beta.messages.stream(
             model=MODEL,
             max_tokens=8000,
-            system=system_prompt,
-            messages=api_messages,
+            system=cached_system(system_prompt),
+            messages=cached_messages(api_messages),
             tools=TOOLS,
             betas=["server-side-fallback-2026-07-01"],
             extra_body={"fallbacks": "default"},
         ) as stream:
-            for event in stream:
+            async for event in stream:
                 if event.type == "content_block_delta" and event.delta.type == "text_delta":
                     yield {"type": "text", "delta": event.delta.text}
                 elif event.type == "content_block_start" \
                         and event.content_block.type == "tool_use":
-                    yield {"type": "tool_pending", "name": event.content_block.name}
-            response = stream.get_final_message()
+                    yield {
+                        "type": "tool_pending", "name": event.content_block.name,
+                        "tool_use_id": event.content_block.id,
+                    }
+            response = await stream.get_final_message()
+        usage["input"] += response.usage.input_tokens
+        usage["cache_read"] += response.usage.cache_read_input_tokens or 0
+        usage["cache_write"] += response.usage.cache_creation_input_tokens or 0
+        usage["output"] += response.usage.output_tokens
 
         text = "".join(block.text for block in response.content if block.type == "text")
         if text.strip():
@@ -263,19 +394,27 @@ def agent_turn_events(
         # unchanged when continuing a tool loop on the same model). Needs anthropic
         # >= 0.125: older SDKs mis-accumulate streamed thinking blocks.
         api_messages.append({"role": "assistant", "content": response.content})
-        tool_results = []
-        for block in response.content:
-            if block.type != "tool_use":
-                continue
-            if block.name == "ask_notebooklm":
-                question = block.input["question"]
-                yield {"type": "tool", "tool_label": "Asking Rigdzin notebook…", "content": question}
-                tool_msg = MorningMessage(
-                    session_id=morning.id, role="tool",
-                    content=question, tool_label="Asked Rigdzin notebook",
-                )
-                result_text = ask_notebooklm(question)
-            else:
+        tool_blocks = [block for block in response.content if block.type == "tool_use"]
+        results: dict[str, str] = {}
+        # NotebookLM queries run as background tasks, concurrently when the model
+        # asks several at once; journal writes stay inline and in order, since
+        # each one builds on the session's current entry.
+        running: dict[asyncio.Task, tuple[str, MorningMessage, float]] = {}
+        try:
+            for block in tool_blocks:
+                if block.name == "ask_notebooklm":
+                    question = block.input["question"]
+                    yield {
+                        "type": "tool", "tool_use_id": block.id,
+                        "tool_label": "Asking Rigdzin notebook…", "content": question,
+                    }
+                    tool_msg = MorningMessage(
+                        session_id=morning.id, role="tool",
+                        content=question, tool_label="Asked Rigdzin notebook",
+                    )
+                    task = asyncio.create_task(run_tool(notebooklm.ask(question)))
+                    running[task] = (block.id, tool_msg, time.monotonic())
+                    continue
                 title = block.input["title"]
                 if closing:
                     created = morning.created_at if morning.created_at.tzinfo \
@@ -283,7 +422,7 @@ def agent_turn_events(
                     entry_date = created.astimezone(user_tz).date()
                 else:
                     entry_date = None
-                label = write_journal(
+                label = await write_journal(
                     morning, title, block.input["body"],
                     user_tz, session, entry_date=entry_date,
                 )
@@ -291,24 +430,52 @@ def agent_turn_events(
                     session_id=morning.id, role="tool",
                     content=title, tool_label=label,
                 )
-                result_text = "Journal entry written."
+                results[block.id] = "Journal entry written."
                 journal_written = True
                 # Entry now exists on disk; keep the system prompt consistent
                 # for any further loop iterations.
-                system_prompt = build_system_prompt(morning, user_tz)
-            session.add(tool_msg)
-            new_messages.append(tool_msg)
-            yield {"type": "tool_done", "message": serialize_message(tool_msg)}
-            tool_results.append({
-                "type": "tool_result",
-                "tool_use_id": block.id,
-                "content": result_text,
-            })
+                system_prompt = await build_system_prompt(morning, user_tz)
+                session.add(tool_msg)
+                new_messages.append(tool_msg)
+                yield {"type": "tool_done", "tool_use_id": block.id, "message": serialize_message(tool_msg)}
+
+            while running:
+                done, _ = await asyncio.wait(
+                    running, timeout=TOOL_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    now = time.monotonic()
+                    yield {"type": "tool_progress", "running": [
+                        {"tool_use_id": tool_use_id, "elapsed_seconds": round(now - started)}
+                        for tool_use_id, _, started in running.values()
+                    ]}
+                for task in done:
+                    tool_use_id, tool_msg, _ = running.pop(task)
+                    results[tool_use_id] = task.result()
+                    session.add(tool_msg)
+                    new_messages.append(tool_msg)
+                    yield {"type": "tool_done", "tool_use_id": tool_use_id, "message": serialize_message(tool_msg)}
+        finally:
+            # Client went away (the response task is cancelled) or the turn
+            # failed: stop outstanding queries rather than leave them running.
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        tool_results = [
+            {"type": "tool_result", "tool_use_id": block.id, "content": results[block.id]}
+            for block in tool_blocks
+        ]
         api_messages.append({"role": "user", "content": tool_results})
 
-    session.commit()
+    logger.info(
+        "Morning turn %s: input=%d cache_read=%d cache_write=%d output=%d tokens",
+        morning.id, usage["input"], usage["cache_read"], usage["cache_write"], usage["output"],
+    )
+    await session.commit()
     for m in new_messages:
-        session.refresh(m)
+        await session.refresh(m)
     yield {
         "type": "done",
         "messages": [serialize_message(m) for m in new_messages],
@@ -316,39 +483,60 @@ def agent_turn_events(
     }
 
 
-def run_agent_turn(*args, **kwargs) -> tuple[list[dict], bool]:
+async def run_agent_turn(*args, **kwargs) -> tuple[list[dict], bool]:
     """Non-streaming wrapper: drain the event stream, return the final result."""
-    for event in agent_turn_events(*args, **kwargs):
+    async for event in agent_turn_events(*args, **kwargs):
         pass
     return event["messages"], event["journal_written"]
 
 
 @router.get("/sessions")
-def list_sessions(session: Session = Depends(get_session)):
-    user = get_user(session)
-    sessions = session.exec(
-        select(MorningSession)
-        .where(MorningSession.user_id == user.id)
-        .order_by(MorningSession.created_at)
-    ).all()
-    counts = {
-        s.id: len(session.exec(
-            select(MorningMessage.id).where(MorningMessage.session_id == s.id)
-        ).all())
-        for s in sessions
+async def list_sessions(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """The newest `limit` sessions, oldest first within the page, with message
+    counts. next_cursor (null on the oldest page) fetches the sessions before these.
+    Only the first page carries `total`: it counts every session, so paging
+    further doesn't pay for it again."""
+    user = await get_user(session)
+    stmt = select(MorningSession).where(MorningSession.user_id == user.id)
+    if cursor:
+        stmt = stmt.where(sa.tuple_(MorningSession.created_at, MorningSession.id) < decode_cursor(cursor))
+    rows = (await session.exec(
+        stmt.order_by(MorningSession.created_at.desc(), MorningSession.id.desc()).limit(limit + 1)
+    )).all()
+    page, has_more = rows[:limit], len(rows) > limit
+    counts = dict((await session.exec(
+        select(MorningMessage.session_id, func.count())
+        .where(MorningMessage.session_id.in_([s.id for s in page]))
+        .group_by(MorningMessage.session_id)
+    )).all()) if page else {}
+    result = {
+        "sessions": [serialize_session(s, counts.get(s.id, 0)) for s in reversed(page)],
+        "next_cursor": encode_cursor(page[-1].created_at, page[-1].id) if has_more else None,
     }
-    return {"sessions": [serialize_session(s, counts[s.id]) for s in sessions]}
+    if not cursor:
+        result["total"] = (await session.exec(
+            select(func.count()).select_from(MorningSession).where(MorningSession.user_id == user.id)
+        )).one()
+    return result
 
 
 @router.post("/sessions")
-def create_session(body: NewSessionRequest, session: Session = Depends(get_session)):
-    user = get_user(session)
+async def create_session(
+    body: NewSessionRequest,
+    session: AsyncSession = Depends(get_async_session),
+    client: anthropic.AsyncAnthropic = Depends(anthropic_client),
+):
+    user = await get_user(session)
     morning = MorningSession(user_id=user.id)
     session.add(morning)
-    session.flush()
-    new_messages, _ = run_agent_turn(
+    await session.flush()
+    new_messages, _ = await run_agent_turn(
         morning, user, user_tz=ZoneInfo(body.timezone),
-        session=session, greeting=True,
+        session=session, client=client, greeting=True,
     )
     return {
         "session": serialize_session(morning, len(new_messages)),
@@ -357,78 +545,129 @@ def create_session(body: NewSessionRequest, session: Session = Depends(get_sessi
 
 
 @router.get("/sessions/{session_id}/messages")
-def get_messages(session_id: UUID, session: Session = Depends(get_session)):
-    messages = session.exec(
+async def get_messages(session_id: UUID, session: AsyncSession = Depends(get_async_session)):
+    messages = (await session.exec(
         select(MorningMessage)
         .where(MorningMessage.session_id == session_id)
         .order_by(MorningMessage.created_at)
-    ).all()
+    )).all()
     return {"messages": [serialize_message(m) for m in messages]}
 
 
+def sse_event(seq: int, event: dict) -> str:
+    return f"id: {seq}\ndata: {json.dumps(event)}\n\n"
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+async def run_chat_turn(session_id: UUID, user_tz: ZoneInfo, client: anthropic.AsyncAnthropic):
+    # The turn outlives the request that started it, so it opens its own session.
+    async with async_session_maker() as turn_session:
+        async for event in agent_turn_events(
+            morning=await turn_session.get(MorningSession, session_id),
+            user=await get_user(turn_session),
+            user_tz=user_tz,
+            session=turn_session,
+            client=client,
+        ):
+            yield event
+
+
 @router.post("/sessions/{session_id}/chat")
-def chat(session_id: UUID, body: ChatRequest, session: Session = Depends(get_session)):
+async def chat(
+    session_id: UUID,
+    body: ChatRequest,
+    session: AsyncSession = Depends(get_async_session),
+    client: anthropic.AsyncAnthropic = Depends(anthropic_client),
+):
     """Server-sent events: text deltas and tool calls as they happen, then a final
-    "done" event with the persisted messages."""
-    morning = session.get(MorningSession, session_id)
+    "done" event with the persisted messages. The first event names the turn; every
+    event carries an id, and a dropped client resumes from turn_events."""
+    morning = await session.get(MorningSession, session_id)
     user_msg = MorningMessage(session_id=morning.id, role="user", content=body.message)
     session.add(user_msg)
-    session.commit()
-
-    def sse():
-        # The request-scoped session is torn down before a StreamingResponse body
-        # runs, so the generator opens its own.
-        with Session(engine) as stream_session:
-            for event in agent_turn_events(
-                morning=stream_session.get(MorningSession, session_id),
-                user=get_user(stream_session),
-                user_tz=ZoneInfo(body.timezone),
-                session=stream_session,
-            ):
-                yield "data: " + json.dumps(event) + "\n\n"
+    await session.commit()
+
+    turn = turns.start(session_id, run_chat_turn(session_id, ZoneInfo(body.timezone), client))
+    await turn.publish({"type": "turn", "turn_id": str(turn.id)})
+
+    async def sse():
+        async for seq, event in turn.events_after(0):
+            yield sse_event(seq, event)
 
     return StreamingResponse(
         sse(),
         media_type="text/event-stream",
-        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        headers={**SSE_HEADERS, "X-Turn-Id": str(turn.id)},
     )
 
 
+@router.get("/sessions/{session_id}/turns/{turn_id}/events")
+async def turn_events(
+    session_id: UUID,
+    turn_id: UUID,
+    after: Optional[int] = None,
+    last_event_id: Optional[int] = Header(default=None),
+):
+    """Resume a turn's stream: replays every event after Last-Event-ID (or ?after=),
+    then follows the turn live if it's still running."""
+    after = after if after is not None else last_event_id or 0
+    turn = turns.get(turn_id)
+    if turn is not None and turn.session_id == session_id:
+        events = turn.events_after(after)
+    elif await turns.stored_session_id(turn_id) == session_id:
+        # Finished and out of memory, or cut short by a restart: what was persisted.
+        async def stored():
+            for seq, event in await turns.load_events(turn_id, after):
+                yield seq, event
+        events = stored()
+    else:
+        raise HTTPException(status_code=404, detail="Turn not found")
+
+    async def sse():
+        async for seq, event in events:
+            yield sse_event(seq, event)
+
+    return StreamingResponse(sse(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 class AddSitRequest(BaseModel):
     sit_minutes: int
     timezone: str = "America/Los_Angeles"
 
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        if not practice_stats.known_timezone(v):
+            raise ValueError(f"Unknown timezone: {v}")
+        return v
+
 
 @router.post("/sessions/{session_id}/sits")
-def add_sit(session_id: UUID, body: AddSitRequest, session: Session = Depends(get_session)):
+async def add_sit(session_id: UUID, body: AddSitRequest, session: AsyncSession = Depends(get_async_session)):
     """The user declares a sit is happening: log it and pin a sit marker message into
     the conversation, splitting pre-sit chat from post-sit reflections. No model turn."""
-    user = get_user(session)
-    morning = session.get(MorningSession, session_id)
+    user = await get_user(session)
+    morning = await session.get(MorningSession, session_id)
     now = datetime.now(tz.utc)
 
     # A backfilled sit today (date known, time nominal) is a placeholder for this
     # moment: the exact-time sit replaces it rather than double-counting the day.
     # Sits that already have real times stay — a second sit in a day is legitimate.
-    user_tz = ZoneInfo(body.timezone)
-    day_start, day_end = _local_day_bounds(now.astimezone(user_tz).date().isoformat(), user_tz)
-    placeholders = session.exec(
-        select(Sit).where(
-            Sit.user_id == user.id,
-            Sit.time_known == False,  # noqa: E712
-            Sit.started_at >= day_start,
-            Sit.started_at < day_end,
-        )
-    ).all()
+    today = now.astimezone(ZoneInfo(body.timezone)).date()
+    placeholders = [s for s in await _sits_on(session, user.id, today) if not s.time_known]
     if placeholders:
         ids = [s.id for s in placeholders]
-        for m in session.exec(
+        for m in (await session.exec(
             select(MorningSession).where(MorningSession.sit_id.in_(ids))
-        ).all():
+        )).all():
             m.sit_id = None
             session.add(m)
         for s in placeholders:
-            session.delete(s)
+            await session.delete(s)
+            await practice_stats.sit_removed(session, s)
+            session.add(DeletedPromptResponse(id=s.id, user_id=user.id, kind="sit"))
 
     sit = Sit(
         user_id=user.id,
@@ -437,55 +676,121 @@ def add_sit(session_id: UUID, body: AddSitRequest, session: Session = Depends(ge
         timezone=body.timezone,
     )
     session.add(sit)
-    session.flush()
+    await practice_stats.sit_added(session, sit)
+    await session.flush()
     morning.sit_id = sit.id
     session.add(morning)
     msg = MorningMessage(session_id=morning.id, role="sit", content=str(body.sit_minutes))
     session.add(msg)
-    session.commit()
-    session.refresh(msg)
+    await session.commit()
+    await session.refresh(msg)
     return {"message": serialize_message(msg)}
 
 
 STALE_AFTER = timedelta(hours=24)
+# Closing turns run at once during a sweep.
+CLOSE_STALE_CONCURRENCY = int(os.getenv("CLOSE_STALE_CONCURRENCY", "3"))
+# A claim older than this belongs to a sweep that died mid-turn; it can be retaken.
+CLOSING_LEASE = timedelta(minutes=10)
+
+
+async def close_session(
+    session_id: UUID, user_id: UUID, user_tz: ZoneInfo, client: anthropic.AsyncAnthropic,
+) -> Optional[bool]:
+    """Run the closing turn for one session. Returns whether an entry was written,
+    or None if another sweep holds the session or already closed it."""
+    claimed_at = datetime.now(tz.utc)
+    async with async_session_maker() as session:
+        # Claim in its own short transaction, so concurrent sweeps (or workers)
+        # never close the same session twice, yet no row lock is held through the
+        # turn's model and tool calls: the user can keep chatting meanwhile.
+        claimed = (await session.exec(
+            sa.update(MorningSession)
+            .where(
+                MorningSession.id == session_id,
+                MorningSession.journal_written_at == None,  # noqa: E711
+                sa.or_(
+                    MorningSession.closing_started_at == None,  # noqa: E711
+                    MorningSession.closing_started_at < claimed_at - CLOSING_LEASE,
+                ),
+            )
+            .values(closing_started_at=claimed_at)
+            .returning(MorningSession.id)
+        )).first()
+        await session.commit()
+        if claimed is None:
+            return None
+        try:
+            morning = await session.get(MorningSession, session_id)
+            user = await session.get(User, user_id)
+            _, journal_written = await run_agent_turn(
+                morning, user, user_tz=user_tz, session=session, client=client, closing=True,
+            )
+            return journal_written
+        finally:
+            async with async_session_maker() as release:
+                await release.exec(
+                    sa.update(MorningSession)
+                    .where(MorningSession.id == session_id, MorningSession.closing_started_at == claimed_at)
+                    .values(closing_started_at=None)
+                )
+                await release.commit()
 
 
 @router.post("/close-stale")
-def close_stale(body: NewSessionRequest, session: Session = Depends(get_session)):
+async def close_stale(
+    body: NewSessionRequest,
+    session: AsyncSession = Depends(get_async_session),
+    client: anthropic.AsyncAnthropic = Depends(anthropic_client),
+):
     """Close out abandoned threads: any session where the user said something, no
     journal entry was written, and nothing has happened for 24h gets its entry
     written for it (unresolved is fine — the question is still worth noting)."""
-    user = get_user(session)
+    user = await get_user(session)
     cutoff = datetime.now(tz.utc) - STALE_AFTER
-    closed = []
-    candidates = session.exec(
-        select(MorningSession).where(
+    has_user_message = (
+        select(MorningMessage.id)
+        .where(MorningMessage.session_id == MorningSession.id, MorningMessage.role == "user")
+        .exists()
+    )
+    candidates = (await session.exec(
+        select(MorningSession.id)
+        .join(MorningMessage, MorningMessage.session_id == MorningSession.id)
+        .where(
             MorningSession.user_id == user.id,
             MorningSession.journal_written_at == None,  # noqa: E711
+            has_user_message,  # greeting-only sessions have nothing worth journaling
         )
-    ).all()
-    for morning in candidates:
-        messages = session.exec(
-            select(MorningMessage).where(MorningMessage.session_id == morning.id)
-        ).all()
-        if not any(m.role == "user" for m in messages):
-            continue  # greeting-only session; nothing worth journaling
-        last = max(m.created_at for m in messages)
-        if last.tzinfo is None:
-            last = last.replace(tzinfo=tz.utc)
-        if last > cutoff:
-            continue
-        _, journal_written = run_agent_turn(
-            morning, user, user_tz=ZoneInfo(body.timezone),
-            session=session, closing=True,
-        )
-        closed.append({"session_id": str(morning.id), "journal_written": journal_written})
-    return {"closed": closed}
+        .group_by(MorningSession.id)
+        .having(func.max(MorningMessage.created_at) < cutoff)
+        .order_by(func.max(MorningMessage.created_at))
+    )).all()
+
+    slots = asyncio.Semaphore(CLOSE_STALE_CONCURRENCY)
+
+    async def close(session_id: UUID) -> Optional[dict]:
+        async with slots:
+            try:
+                journal_written = await close_session(session_id, user.id, ZoneInfo(body.timezone), client)
+            except Exception as e:
+                logger.exception("Closing morning session %s failed", session_id)
+                return {"session_id": str(session_id), "journal_written": False, "error": str(e)}
+        if journal_written is None:
+            return None
+        return {"session_id": str(session_id), "journal_written": journal_written}
+
+    results = await asyncio.gather(*(close(session_id) for session_id in candidates))
+    return {"closed": [r for r in results if r is not None]}
+
+
+@router.get("/notebooklm/cache")
+async def notebooklm_cache_stats():
+    return await notebooklm.cache_stats()
 
 
 @router.get("/journal")
-def get_journal(limit: Optional[int] = None):
-    return {"entries": journal.read_entries(limit=limit)}
+async def get_journal(limit: Optional[int] = None):
+    return {"entries": await asyncio.to_thread(journal.read_entries, limit=limit)}
 
 
 class ToggleSitRequest(BaseModel):
@@ -493,65 +798,77 @@ class ToggleSitRequest(BaseModel):
     sit_minutes: int = 30
     timezone: str = "America/Los_Angeles"
 
+    @field_validator("timezone")
+    @classmethod
+    def validate_timezone(cls, v: str) -> str:
+        if not practice_stats.known_timezone(v):
+            raise ValueError(f"Unknown timezone: {v}")
+        return v
+
 
 def _local_day_bounds(date_str: str, tz: ZoneInfo) -> tuple[datetime, datetime]:
     day_start = datetime.fromisoformat(date_str).replace(tzinfo=tz)
     return day_start, day_start + timedelta(days=1)
 
 
+async def _sits_on(session: AsyncSession, user_id: UUID, day: date) -> list[Sit]:
+    """The user's sits on a local date by the rollup's rule: the date in the
+    timezone each sit was logged in. Every zone's `day` falls within a day either
+    side of it in UTC."""
+    midnight = datetime.combine(day, datetime.min.time(), tzinfo=tz.utc)
+    sits = (await session.exec(
+        select(Sit).where(
+            Sit.user_id == user_id,
+            Sit.started_at >= midnight - timedelta(days=1),
+            Sit.started_at < midnight + timedelta(days=2),
+        )
+    )).all()
+    return [s for s in sits if practice_stats.local_date(s.started_at, s.timezone) == day]
+
+
 @router.get("/sits")
-def list_sits(
+async def list_sits(
     start: str,
     end: str,
-    timezone: str = "America/Los_Angeles",
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
-    """Minutes sat per local date within [start, end], for the calendar widget."""
-    user = get_user(session)
-    user_tz = ZoneInfo(timezone)
-    range_start, _ = _local_day_bounds(start, user_tz)
-    _, range_end = _local_day_bounds(end, user_tz)
-    sits = session.exec(
-        select(Sit).where(
-            Sit.user_id == user.id,
-            Sit.started_at >= range_start,
-            Sit.started_at < range_end,
+    """Minutes sat per local date within [start, end], for the calendar widget.
+    Read from the daily rollup, where each sit counts toward the local date it was
+    logged in."""
+    user = await get_user(session)
+    rows = (await session.exec(
+        select(DailyPracticeStats.local_date, DailyPracticeStats.sit_minutes).where(
+            DailyPracticeStats.user_id == user.id,
+            DailyPracticeStats.local_date >= date.fromisoformat(start),
+            DailyPracticeStats.local_date <= date.fromisoformat(end),
+            DailyPracticeStats.sit_count > 0,
         )
-    ).all()
-    days: dict[str, int] = {}
-    for s in sits:
-        started = s.started_at if s.started_at.tzinfo else s.started_at.replace(tzinfo=tz.utc)
-        d = started.astimezone(user_tz).date().isoformat()
-        days[d] = days.get(d, 0) + round(s.duration_seconds / 60)
-    return {"days": days}
+    )).all()
+    return {"days": {day.isoformat(): minutes for day, minutes in rows}}
 
 
 @router.post("/sits/toggle")
-def toggle_sit(body: ToggleSitRequest, session: Session = Depends(get_session)):
+async def toggle_sit(body: ToggleSitRequest, session: AsyncSession = Depends(get_async_session)):
     """Backfill helper: tap a day to declare/undeclare a sit. A day with any sits
     is cleared; an empty day gets one sit of the given length, nominally 8am."""
-    user = get_user(session)
-    user_tz = ZoneInfo(body.timezone)
-    day_start, day_end = _local_day_bounds(body.date, user_tz)
-    sits = session.exec(
-        select(Sit).where(
-            Sit.user_id == user.id,
-            Sit.started_at >= day_start,
-            Sit.started_at < day_end,
-        )
-    ).all()
+    user = await get_user(session)
+    # Same days the calendar shows, so a tap clears exactly what it displays.
+    sits = await _sits_on(session, user.id, date.fromisoformat(body.date))
     if sits:
         sit_ids = [s.id for s in sits]
-        for m in session.exec(
+        for m in (await session.exec(
             select(MorningSession).where(MorningSession.sit_id.in_(sit_ids))
-        ).all():
+        )).all():
             m.sit_id = None
             session.add(m)
         for s in sits:
-            session.delete(s)
-        session.commit()
+            await session.delete(s)
+            await practice_stats.sit_removed(session, s)
+            session.add(DeletedPromptResponse(id=s.id, user_id=user.id, kind="sit"))
+        await session.commit()
         return {"date": body.date, "minutes": 0}
 
+    day_start, _ = _local_day_bounds(body.date, ZoneInfo(body.timezone))
     sit = Sit(
         user_id=user.id,
         duration_seconds=float(body.sit_minutes * 60),
@@ -560,5 +877,6 @@ def toggle_sit(body: ToggleSitRequest, session: Session = Depends(get_session)):
         time_known=False,
     )
     session.add(sit)
-    session.commit()
+    await practice_stats.sit_added(session, sit)
+    await session.commit()
     return {"date": body.date, "minutes": body.sit_minutes}
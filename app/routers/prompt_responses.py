@@ -1,54 +1,31 @@
+import asyncio
+import hashlib
 import json
+import os
 from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID
-import os
-import tempfile
-import boto3
-import openai
-from fastapi import APIRouter, Depends, Query, UploadFile, File, Form, HTTPException
-from sqlmodel import Session, select
-from app.db import get_session
+import sqlalchemy as sa
+from fastapi import APIRouter, Depends, Query, Request, UploadFile, File, Form, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
 from app.auth import get_current_user
-from app.models import Sit, Checkin, User
+from app.models import Sit, Checkin, DeletedPromptResponse, User
+from app.pagination import decode_cursor, encode_cursor
+from app.storage import Storage, get_storage
+from app import practice_stats, transcription
 
 router = APIRouter(prefix="/api/prompt-responses", tags=["prompt_responses"])
 
-S3_BUCKET = os.getenv("S3_BUCKET", "sit-voice-notes")
-AWS_REGION = os.getenv("AWS_REGION", "us-west-2")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-
-def get_s3_client():
-    return boto3.client("s3", region_name=AWS_REGION)
-
-
-def transcribe_audio(file_contents: bytes, filename: str) -> str:
-    """Transcribe audio using OpenAI Whisper API."""
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-    suffix = "." + filename.split(".")[-1] if "." in filename else ".m4a"
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as f:
-        f.write(file_contents)
-        temp_path = f.name
-
-    try:
-        with open(temp_path, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="text"
-            )
-        return transcript
-    finally:
-        os.remove(temp_path)
-
 
 @router.get("")
-def list_prompt_responses(
+async def list_prompt_responses(
     limit: Optional[int] = Query(default=None),
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> list[Checkin]:
     statement = (
         select(Checkin)
@@ -57,7 +34,74 @@ def list_prompt_responses(
     )
     if limit:
         statement = statement.limit(limit)
-    return session.exec(statement).all()
+    return (await session.exec(statement)).all()
+
+
+@router.get("/feed")
+async def prompt_response_feed(
+    request: Request,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = Query(default=None),
+    updated_since: Optional[datetime] = Query(default=None),
+    user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    """Sits and checkins in one keyset-paginated feed.
+
+    Browse mode (no updated_since): newest first by when it happened (started_at
+    for sits, responded_at for checkins). Delta mode: everything created or
+    changed after updated_since, oldest change first, plus tombstones for
+    deletions (first page only). Follow next_cursor until it is null; in delta
+    mode, then store sync_token and send it as updated_since next time.
+    Responses carry an ETag and honor If-None-Match.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    delta = updated_since is not None
+
+    rows: list[tuple[datetime, UUID, str, Sit | Checkin]] = []
+    for model, kind, happened_at in ((Sit, "sit", Sit.started_at), (Checkin, "checkin", Checkin.responded_at)):
+        key = model.updated_at if delta else happened_at
+        stmt = select(model).where(model.user_id == user.id)
+        if delta:
+            stmt = stmt.where(model.updated_at > updated_since)
+            if after:
+                stmt = stmt.where(sa.tuple_(key, model.id) > after)
+            stmt = stmt.order_by(key, model.id)
+        else:
+            if after:
+                stmt = stmt.where(sa.tuple_(key, model.id) < after)
+            stmt = stmt.order_by(key.desc(), model.id.desc())
+        # limit + 1 from each side is enough to fill a merged page and know
+        # whether another follows.
+        for row in (await session.exec(stmt.limit(limit + 1))).all():
+            ts = row.updated_at if delta else (row.started_at if kind == "sit" else row.responded_at)
+            rows.append((ts, row.id, kind, row))
+    rows.sort(key=lambda r: (r[0], r[1]), reverse=not delta)
+    page, has_more = rows[:limit], len(rows) > limit
+
+    body = {
+        "items": [{"type": kind, **jsonable_encoder(row)} for _, _, kind, row in page],
+        "next_cursor": encode_cursor(page[-1][0], page[-1][1]) if has_more else None,
+    }
+    if delta:
+        deleted = []
+        if not cursor:
+            deleted = (await session.exec(
+                select(DeletedPromptResponse)
+                .where(DeletedPromptResponse.user_id == user.id, DeletedPromptResponse.deleted_at > updated_since)
+                .order_by(DeletedPromptResponse.deleted_at)
+            )).all()
+        body["deleted"] = [{"id": str(d.id), "type": d.kind, "deleted_at": d.deleted_at.isoformat()} for d in deleted]
+        # A re-sent tombstone is harmless, so the newest change seen is a safe
+        # high-water mark.
+        seen = [ts for ts, _, _, _ in page] + [d.deleted_at for d in deleted]
+        body["sync_token"] = max(seen, default=updated_since).isoformat()
+
+    content = json.dumps(body, separators=(",", ":")).encode()
+    etag = '"' + hashlib.sha256(content).hexdigest()[:32] + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=content, media_type="application/json", headers={"ETag": etag})
 
 
 @router.post("")
@@ -71,8 +115,13 @@ async def log_prompt_response(
     timezone_param: str = Form(..., alias="timezone"),
     voice_note: Optional[UploadFile] = File(None),
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    storage: Storage = Depends(get_storage),
 ):
+    # The rollup buckets by this zone, so it has to be one we can resolve.
+    if not practice_stats.known_timezone(timezone_param):
+        raise HTTPException(status_code=422, detail=f"Unknown timezone: {timezone_param}")
+
     # Route to Sit if duration_seconds is provided (timer/meditation session)
     if duration_seconds is not None:
         started_at = datetime.fromtimestamp((responded_at - duration_seconds * 1000) / 1000, tz=timezone.utc)
@@ -83,34 +132,22 @@ async def log_prompt_response(
             timezone=timezone_param,
         )
         session.add(sit)
-        session.commit()
-        session.refresh(sit)
+        await practice_stats.sit_added(session, sit)
+        await session.commit()
+        await session.refresh(sit)
         return sit
 
-    # Otherwise create a Checkin
-    s3_url = None
-    transcription = None
-    transcription_status = None
+    # Otherwise create a Checkin. Transcription happens in the worker
+    # (app/transcription.py), so the response doesn't wait on Whisper.
+    voice_note_s3_url = None
 
     if voice_note:
-        s3_client = get_s3_client()
         timestamp = int(datetime.now(timezone.utc).timestamp() * 1000)
-        s3_key = f"voice_notes/{timestamp}_{voice_note.filename}"
-
-        contents = await voice_note.read()
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=s3_key,
-            Body=contents,
-            ContentType=voice_note.content_type or "audio/m4a"
-        )
-        s3_url = f"s3://{S3_BUCKET}/{s3_key}"
+        key = f"voice_notes/{timestamp}_{os.path.basename(voice_note.filename or 'voice_note.m4a')}"
 
-        if OPENAI_API_KEY:
-            transcription = transcribe_audio(contents, voice_note.filename)
-            transcription_status = "completed"
-        else:
-            transcription_status = "skipped_no_api_key"
+        # Streamed chunk by chunk; the note is never held in memory whole.
+        await storage.save_stream(key, voice_note.read, voice_note.content_type or "audio/m4a")
+        voice_note_s3_url = storage.url(key)
 
     parsed_steps = json.loads(steps) if steps else None
     parsed_flow_id = UUID(flow_id) if flow_id else None
@@ -120,44 +157,52 @@ async def log_prompt_response(
         flow_id=parsed_flow_id,
         responded_at=datetime.fromtimestamp(responded_at / 1000, tz=timezone.utc),
         steps=parsed_steps,
-        voice_note_s3_url=s3_url,
+        voice_note_s3_url=voice_note_s3_url,
         voice_note_duration_seconds=voice_note_duration_seconds,
-        transcription=transcription,
-        transcription_status=transcription_status,
         schedule_type=schedule_type,
         timezone=timezone_param,
     )
-
     session.add(checkin)
-    session.commit()
-    session.refresh(checkin)
+    await practice_stats.checkin_added(session, checkin)
+
+    if voice_note:
+        if transcription.enabled():
+            transcription.enqueue(session, checkin)
+        else:
+            checkin.transcription_status = "skipped_no_api_key"
+
+    await session.commit()
+    await session.refresh(checkin)
 
     return checkin
 
 
 @router.delete("/{response_id}")
-def delete_prompt_response(
+async def delete_prompt_response(
     response_id: UUID,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
+    storage: Storage = Depends(get_storage),
 ) -> dict:
     # Check sits first
-    sit = session.get(Sit, response_id)
+    sit = await session.get(Sit, response_id)
     if sit and sit.user_id == user.id:
-        session.delete(sit)
-        session.commit()
+        await session.delete(sit)
+        await practice_stats.sit_removed(session, sit)
+        session.add(DeletedPromptResponse(id=sit.id, user_id=user.id, kind="sit"))
+        await session.commit()
         return {"deleted": True}
 
     # Then check checkins
-    checkin = session.get(Checkin, response_id)
+    checkin = await session.get(Checkin, response_id)
     if not checkin or checkin.user_id != user.id:
         raise HTTPException(status_code=404, detail="Prompt response not found")
 
     if checkin.voice_note_s3_url:
-        s3_client = get_s3_client()
-        s3_key = checkin.voice_note_s3_url.replace(f"s3://{S3_BUCKET}/", "")
-        s3_client.delete_object(Bucket=S3_BUCKET, Key=s3_key)
+        await asyncio.to_thread(storage.delete, storage.key(checkin.voice_note_s3_url))
 
-    session.delete(checkin)
-    session.commit()
+    await session.delete(checkin)
+    await practice_stats.checkin_removed(session, checkin)
+    session.add(DeletedPromptResponse(id=checkin.id, user_id=user.id, kind="checkin"))
+    await session.commit()
     return {"deleted": True}
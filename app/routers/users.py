@@ -1,11 +1,14 @@
 from typing import Optional
 from uuid import UUID
-from pydantic import BaseModel
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
-from app.db import get_session
-from app.auth import get_current_user
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel, Field, model_validator
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app.db import get_async_session
+from app.auth import get_current_user, invalidate_user
 from app.models import User, Flow
+from app.scheduler import reschedule_user, scheduler
 from app.default_flow import DEFAULT_FLOW_NAME, DEFAULT_FLOW_DESCRIPTION, DEFAULT_FLOW_STEPS
 
 router = APIRouter(prefix="/api/me", tags=["users"])
@@ -42,9 +45,17 @@ class UpdateFlowRequest(BaseModel):
 
 
 class UpdateNotificationsRequest(BaseModel):
-    count: int
-    start_hour: int
-    end_hour: int
+    count: int = Field(ge=0)
+    # Local hours; check-ins land in [start_hour, end_hour).
+    start_hour: int = Field(ge=0, le=23)
+    end_hour: int = Field(ge=0, le=23)
+    timezone: Optional[str] = None
+
+    @model_validator(mode="after")
+    def validate_window(self) -> "UpdateNotificationsRequest":
+        if self.start_hour >= self.end_hour:
+            raise ValueError("start_hour must be before end_hour")
+        return self
 
 
 class UpdateConversationStartersRequest(BaseModel):
@@ -52,13 +63,13 @@ class UpdateConversationStartersRequest(BaseModel):
 
 
 @router.get("", response_model=UserProfileResponse)
-def get_profile(
+async def get_profile(
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     current_flow = None
     if user.current_flow_id:
-        flow = session.get(Flow, user.current_flow_id)
+        flow = await session.get(Flow, user.current_flow_id)
         if flow:
             current_flow = FlowResponse(
                 id=flow.id,
@@ -78,11 +89,12 @@ def get_profile(
             steps_json=DEFAULT_FLOW_STEPS,
         )
         session.add(flow)
-        session.flush()
+        await session.flush()
         user.current_flow_id = flow.id
         session.add(user)
-        session.commit()
-        session.refresh(flow)
+        await session.commit()
+        invalidate_user(user.id)
+        await session.refresh(flow)
         current_flow = FlowResponse(
             id=flow.id,
             name=flow.name,
@@ -106,19 +118,18 @@ def get_profile(
 
 
 @router.put("/flow", response_model=FlowResponse)
-def update_flow(
+async def update_flow(
     body: UpdateFlowRequest,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     # If flow has source attribution and was modified, auto-flip to private
     visibility = body.visibility
     if body.source_username:
         # Check if the source flow still matches
-        from sqlmodel import select
-        source_user = session.exec(select(User).where(User.username == body.source_username)).first()
+        source_user = (await session.exec(select(User).where(User.username == body.source_username))).first()
         if source_user and source_user.current_flow_id:
-            source_flow = session.get(Flow, source_user.current_flow_id)
+            source_flow = await session.get(Flow, source_user.current_flow_id)
             if source_flow and source_flow.steps_json != body.steps_json:
                 visibility = "private"
 
@@ -132,12 +143,13 @@ def update_flow(
         visibility=visibility,
     )
     session.add(flow)
-    session.flush()
+    await session.flush()
 
     user.current_flow_id = flow.id
     session.add(user)
-    session.commit()
-    session.refresh(flow)
+    await session.commit()
+    invalidate_user(user.id)
+    await session.refresh(flow)
 
     return FlowResponse(
         id=flow.id,
@@ -151,37 +163,49 @@ def update_flow(
 
 
 @router.put("/notifications")
-def update_notifications(
+async def update_notifications(
     body: UpdateNotificationsRequest,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
+    if body.timezone:
+        try:
+            ZoneInfo(body.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise HTTPException(status_code=422, detail=f"Unknown timezone: {body.timezone}")
     user.notification_count = body.count
     user.notification_start_hour = body.start_hour
     user.notification_end_hour = body.end_hour
+    if body.timezone:
+        user.timezone = body.timezone
     session.add(user)
-    session.commit()
+    await reschedule_user(session, user)
+    await session.commit()
+    invalidate_user(user.id)
+    scheduler.wake()
     return {"ok": True}
 
 
 @router.put("/conversation-starters")
-def update_conversation_starters(
+async def update_conversation_starters(
     body: UpdateConversationStartersRequest,
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     user.conversation_starters = body.starters
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
     return {"ok": True}
 
 
 @router.put("/onboarding-seen")
-def mark_onboarding_seen(
+async def mark_onboarding_seen(
     user: User = Depends(get_current_user),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ):
     user.has_seen_onboarding = True
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
     return {"ok": True}
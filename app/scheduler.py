@@ -0,0 +1,269 @@
+"""Server-side scheduled check-ins.
+
+Each user with notification_count > 0 gets that many check-in pushes per local day,
+one at a random moment inside each equal segment of [notification_start_hour,
+notification_end_hour) in their timezone. Plans for today and tomorrow are
+persisted as scheduled_checkins rows — (user, local_date, slot) is unique, so
+replanning after a restart, or from several uvicorn workers, never duplicates a
+slot. A row is marked sent before its push goes out and claims use SKIP LOCKED,
+so no slot fires twice; rows whose moment passed while the server was down are
+marked missed rather than fired late.
+
+In process, a min-heap of upcoming fire times decides how long the loop sleeps.
+Due rows are claimed and dispatched in batches: one query each for their users,
+flows and device tokens, then one concurrent APNs fan-out.
+
+Enable with SCHEDULER_ENABLED=true.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app import apns
+from app.db import async_session_maker
+from app.models import DeviceToken, Flow, ScheduledCheckin, User
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "").lower() == "true"
+DEFAULT_TIMEZONE = os.getenv("SCHEDULER_DEFAULT_TIMEZONE", "America/Los_Angeles")
+BATCH_SIZE = int(os.getenv("SCHEDULER_BATCH_SIZE", "500"))
+PLAN_INTERVAL = 10 * 60
+MAX_SLEEP = 60
+# A slot this far past its fire time (server was down) is dropped, not sent late.
+MISSED_AFTER = timedelta(minutes=15)
+SCHEDULE_TYPE = "random"
+
+
+def user_timezone(user: User) -> ZoneInfo:
+    return ZoneInfo(user.timezone or DEFAULT_TIMEZONE)
+
+
+def plan_times(
+    count: int, start_hour: int, end_hour: int, local_date: date, tz: ZoneInfo,
+    rng: random.Random = random,
+) -> list[datetime]:
+    """One random UTC moment inside each of `count` equal segments of the local
+    window. An empty or inverted window plans nothing."""
+    if count <= 0 or end_hour <= start_hour:
+        return []
+    midnight = datetime(local_date.year, local_date.month, local_date.day, tzinfo=tz)
+    window_start = midnight + timedelta(hours=start_hour)
+    segment = (timedelta(hours=end_hour) - timedelta(hours=start_hour)) / count
+    return [
+        (window_start + segment * i + segment * rng.random()).astimezone(timezone.utc)
+        for i in range(count)
+    ]
+
+
+async def plan_user(session: AsyncSession, user: User, days: list[date], now: datetime) -> None:
+    """Insert the user's future slots for the given local dates; slots that already
+    exist (fired, or planned by another worker) are left alone."""
+    tz = user_timezone(user)
+    rows = [
+        {"id": uuid.uuid4(), "user_id": user.id,
+         "local_date": day, "slot": slot, "fire_at": fire_at,
+         "status": "pending", "created_at": now}
+        for day in days
+        for slot, fire_at in enumerate(plan_times(
+            user.notification_count, user.notification_start_hour,
+            user.notification_end_hour, day, tz,
+        ))
+        if fire_at > now
+    ]
+    if rows:
+        await session.exec(insert(ScheduledCheckin).values(rows).on_conflict_do_nothing(
+            index_elements=["user_id", "local_date", "slot"],
+        ))
+
+
+async def reschedule_user(session: AsyncSession, user: User) -> None:
+    """Drop the user's pending slots and replan from their current settings. Call
+    after changing notification settings; the caller commits, then wake()s."""
+    now = datetime.now(timezone.utc)
+    await session.exec(delete(ScheduledCheckin).where(
+        ScheduledCheckin.user_id == user.id,
+        ScheduledCheckin.status == "pending",
+    ))
+    today = now.astimezone(user_timezone(user)).date()
+    await plan_user(session, user, [today, today + timedelta(days=1)], now)
+
+
+class Scheduler:
+    def __init__(self):
+        self._heap: list[tuple[datetime, UUID]] = []
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_plan = 0.0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Re-read the schedule now (e.g. after a user's settings changed)."""
+        self._wake.set()
+
+    async def _run(self) -> None:
+        reload = False
+        while True:
+            try:
+                if time.monotonic() >= self._next_plan:
+                    await self.plan_all()
+                    self._next_plan = time.monotonic() + PLAN_INTERVAL
+                    reload = True
+                if reload:
+                    # Stays set if load() fails, so the next pass retries it.
+                    await self.load()
+                    reload = False
+                while await self.dispatch_due():
+                    pass
+            except Exception:
+                logger.exception("Scheduler loop error")
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self._sleep_seconds())
+                reload = True
+            except asyncio.TimeoutError:
+                pass
+
+    def _sleep_seconds(self) -> float:
+        if not self._heap:
+            return MAX_SLEEP
+        until = (self._heap[0][0] - datetime.now(timezone.utc)).total_seconds()
+        return min(MAX_SLEEP, max(0.0, until))
+
+    async def plan_all(self) -> None:
+        """Plan today and tomorrow (local) for every user missing a plan."""
+        now = datetime.now(timezone.utc)
+        async with async_session_maker() as session:
+            users = (await session.exec(select(User).where(User.notification_count > 0))).all()
+            planned = {(user_id, day) for user_id, day in (await session.exec(
+                select(ScheduledCheckin.user_id, ScheduledCheckin.local_date)
+                .where(ScheduledCheckin.local_date >= (now - timedelta(days=1)).date())
+                .distinct()
+            )).all()}
+            for user in users:
+                today = now.astimezone(user_timezone(user)).date()
+                days = [d for d in (today, today + timedelta(days=1)) if (user.id, d) not in planned]
+                if days:
+                    await plan_user(session, user, days, now)
+            await session.commit()
+
+    async def load(self) -> None:
+        """Rebuild the heap from pending rows due before the next planning pass."""
+        horizon = datetime.now(timezone.utc) + timedelta(seconds=PLAN_INTERVAL)
+        async with async_session_maker() as session:
+            rows = (await session.exec(
+                select(ScheduledCheckin.fire_at, ScheduledCheckin.id)
+                .where(ScheduledCheckin.status == "pending", ScheduledCheckin.fire_at <= horizon)
+            )).all()
+        self._heap = [(fire_at, id) for fire_at, id in rows]
+        heapq.heapify(self._heap)
+
+    async def dispatch_due(self) -> bool:
+        """Claim and send one batch of due slots. Returns True if the batch was
+        full (more may be waiting)."""
+        now = datetime.now(timezone.utc)
+        while self._heap and self._heap[0][0] <= now:
+            heapq.heappop(self._heap)
+
+        async with async_session_maker() as session:
+            due = (await session.exec(
+                select(ScheduledCheckin)
+                .where(ScheduledCheckin.status == "pending", ScheduledCheckin.fire_at <= now)
+                .order_by(ScheduledCheckin.fire_at)
+                .limit(BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not due:
+                return False
+
+            to_send: list[ScheduledCheckin] = []
+            for row in due:
+                if now - row.fire_at > MISSED_AFTER:
+                    row.status = "missed"
+                else:
+                    row.status = "sent"
+                    row.sent_at = now
+                    to_send.append(row)
+                session.add(row)
+            # Committed before sending: a crash mid-fan-out loses a push rather
+            # than double-firing it on restart.
+            await session.commit()
+
+            if to_send and apns.is_configured():
+                await self._send(session, to_send)
+                await session.commit()
+            elif to_send:
+                logger.warning("Scheduler: %d check-ins due but APNs is not configured", len(to_send))
+        return len(due) == BATCH_SIZE
+
+    async def _send(self, session: AsyncSession, rows: list[ScheduledCheckin]) -> None:
+        user_ids = {r.user_id for r in rows}
+        users = {u.id: u for u in (await session.exec(select(User).where(User.id.in_(user_ids)))).all()}
+        flow_ids = {u.current_flow_id for u in users.values() if u.current_flow_id}
+        flows = {f.id: f for f in (await session.exec(select(Flow).where(Flow.id.in_(flow_ids)))).all()} \
+            if flow_ids else {}
+        devices: dict[UUID, list[DeviceToken]] = defaultdict(list)
+        for device in (await session.exec(
+            select(DeviceToken).where(
+                DeviceToken.user_id.in_(user_ids),
+                DeviceToken.platform == "watchos",
+                DeviceToken.disabled_at == None,  # noqa: E711
+            )
+        )).all():
+            devices[device.user_id].append(device)
+
+        async def send_row(row: ScheduledCheckin) -> list[Optional[Exception]]:
+            user = users.get(row.user_id)
+            flow = flows.get(user.current_flow_id) if user else None
+            if not flow or not devices[row.user_id]:
+                row.status = "failed"
+                row.error = "no current flow" if not flow else "no Watch device tokens"
+                return []
+            title, body, extra = apns.checkin_push(flow, SCHEDULE_TYPE)
+            results = await apns.client.send_many(
+                [d.token for d in devices[row.user_id]], title, body, extra,
+            )
+            errors = [str(e) for e in results if e is not None]
+            if len(errors) == len(results):
+                row.status = "failed"
+            if errors:
+                row.error = "; ".join(errors)[-2000:]
+            return results
+
+        results = await asyncio.gather(*(send_row(r) for r in rows))
+        # Session writes stay sequential: an AsyncSession isn't safe to share
+        # across concurrently running tasks.
+        for row, row_results in zip(rows, results):
+            session.add(row)
+            if row_results:
+                await apns.record_results(session, devices[row.user_id], row_results)
+        logger.info("Scheduler: dispatched %d check-ins", len(rows))
+
+
+scheduler = Scheduler()
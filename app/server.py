@@ -18,7 +18,11 @@ if sentry_dsn:
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
 
-from app.db import init_db
+from app.db import init_db, close_db
+from app import apns, passwords
+from app.auth import auth_cache_stats
+from app.clients import clients
+from app.scheduler import SCHEDULER_ENABLED, scheduler
 from app.routers import prompt_responses, auth, users, explore, chat, triggers, morning
 
 app = FastAPI(title="Sit API", description="Meditation tracking backend")
@@ -51,12 +55,24 @@ app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
+    return {"status": "healthy", "auth_cache": auth_cache_stats()}
 
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     init_db()
+    clients.start()
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await scheduler.stop()
+    await apns.close()
+    await clients.aclose()
+    passwords.shutdown()
+    await close_db()
 
 
 if __name__ == "__main__":
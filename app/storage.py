@@ -0,0 +1,132 @@
+"""Voice-note object storage.
+
+Uploads are streamed: the request body is read UPLOAD_CHUNK_SIZE bytes at a time
+and each chunk goes straight out as an S3 multipart part, so memory per upload
+is one chunk however long the note is.
+
+STORAGE_BACKEND selects the backend:
+  s3     — S3_BUCKET in AWS_REGION (default). Set S3_ENDPOINT_URL to point at
+           MinIO or another S3-compatible server.
+  local  — files under STORAGE_LOCAL_DIR; for tests and local development.
+"""
+import asyncio
+import os
+import shutil
+from typing import Awaitable, BinaryIO, Callable
+
+from app.clients import clients
+
+S3_BUCKET = os.getenv("S3_BUCKET", "sit-voice-notes")
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+STORAGE_LOCAL_DIR = os.getenv("STORAGE_LOCAL_DIR", "/tmp/sit-storage")
+# S3 rejects multipart parts under 5 MiB (except the last), so that's the floor.
+UPLOAD_CHUNK_SIZE = max(int(os.getenv("UPLOAD_CHUNK_SIZE", str(5 * 1024 * 1024))), 5 * 1024 * 1024)
+
+ReadChunk = Callable[[int], Awaitable[bytes]]
+
+
+def get_s3_client():
+    """The process-wide S3 client (app/clients.py); boto3 clients are thread-safe."""
+    return clients.s3
+
+
+class S3Storage:
+    def __init__(self, bucket: str = S3_BUCKET):
+        self.bucket = bucket
+
+    def url(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def key(self, url: str) -> str:
+        return url.replace(f"s3://{self.bucket}/", "")
+
+    async def save_stream(self, key: str, read_chunk: ReadChunk, content_type: str) -> int:
+        """Stream read_chunk() into key. Returns the number of bytes stored."""
+        client = get_s3_client()
+        chunk = await read_chunk(UPLOAD_CHUNK_SIZE)
+        if len(chunk) < UPLOAD_CHUNK_SIZE:
+            # Short first read means it all fits in one part: a plain PUT is one
+            # round-trip instead of three.
+            await asyncio.to_thread(
+                client.put_object, Bucket=self.bucket, Key=key, Body=chunk, ContentType=content_type,
+            )
+            return len(chunk)
+
+        upload = await asyncio.to_thread(
+            client.create_multipart_upload, Bucket=self.bucket, Key=key, ContentType=content_type,
+        )
+        upload_id = upload["UploadId"]
+        parts = []
+        size = 0
+        try:
+            while chunk:
+                part_number = len(parts) + 1
+                part = await asyncio.to_thread(
+                    client.upload_part, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=chunk,
+                )
+                parts.append({"PartNumber": part_number, "ETag": part["ETag"]})
+                size += len(chunk)
+                chunk = await read_chunk(UPLOAD_CHUNK_SIZE)
+            await asyncio.to_thread(
+                client.complete_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except BaseException:
+            await asyncio.to_thread(
+                client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id,
+            )
+            raise
+        return size
+
+    def download_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        get_s3_client().download_fileobj(self.bucket, key, fileobj)
+
+    def delete(self, key: str) -> None:
+        get_s3_client().delete_object(Bucket=self.bucket, Key=key)
+
+
+class LocalStorage:
+    def __init__(self, root: str = STORAGE_LOCAL_DIR):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        path = os.path.realpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Storage key escapes root: {key!r}")
+        return path
+
+    def url(self, key: str) -> str:
+        return f"file://{self._path(key)}"
+
+    def key(self, url: str) -> str:
+        return os.path.relpath(url.removeprefix("file://"), os.path.realpath(self.root))
+
+    async def save_stream(self, key: str, read_chunk: ReadChunk, content_type: str) -> int:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = 0
+        with open(path, "wb") as f:
+            while chunk := await read_chunk(UPLOAD_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+        return size
+
+    def download_fileobj(self, key: str, fileobj: BinaryIO) -> None:
+        with open(self._path(key), "rb") as f:
+            shutil.copyfileobj(f, fileobj)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+Storage = S3Storage | LocalStorage
+
+
+def get_storage() -> Storage:
+    if STORAGE_BACKEND == "local":
+        return LocalStorage()
+    return S3Storage()
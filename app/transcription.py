@@ -0,0 +1,327 @@
+"""Voice-note transcription, run off the request path.
+
+log_prompt_response stores the checkin with transcription_status="pending" and
+enqueues a TranscriptionJob in the same transaction. This worker claims due jobs
+(FOR UPDATE SKIP LOCKED, so several workers can run side by side), streams the
+stored note into a temp file, sends it to Whisper, and fills in Checkin.transcription. Failures
+retry with exponential backoff; after MAX_ATTEMPTS the checkin is marked failed.
+
+A note whose length isn't known goes to the backend whole unless it's over
+Whisper's upload limit. Notes longer than one chunk are cut with ffmpeg into CHUNK_SECONDS pieces that
+overlap by OVERLAP_SECONDS, transcribed CONCURRENCY at a time and stitched back
+together, so wall time stays near one chunk's and no request nears Whisper's
+upload limit. Each time the finished run of chunks from the start grows, the
+stitched text so far is saved with transcription_status="partial". Without
+ffmpeg on the PATH every note is sent whole, and one over the limit fails.
+
+TRANSCRIPTION_BACKEND selects the backend:
+  openai — Whisper (default).
+  fake   — no network: one word per second of audio ("s0 s1 ..."), so a stitched
+           transcript reads back as an unbroken count. For tests and local development.
+
+Run:
+  cd /opt/sit && source .venv/bin/activate && python -m app.transcription
+"""
+import logging
+import math
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import and_, or_
+from sqlmodel import Session, select
+
+from app.clients import clients
+from app.db import engine
+from app.models import Checkin, TranscriptionJob
+from app.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+TRANSCRIPTION_BACKEND = os.getenv("TRANSCRIPTION_BACKEND", "openai")
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "90"))
+# Long enough that a word cut at one chunk's edge is heard whole in its neighbour.
+OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_OVERLAP_SECONDS", "4"))
+CONCURRENCY = int(os.getenv("TRANSCRIPTION_CONCURRENCY", "4"))
+# Whisper rejects uploads above 25 MB.
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+FAKE_DELAY_SECONDS = float(os.getenv("TRANSCRIPTION_FAKE_DELAY_SECONDS", "0"))
+# Stitching looks for the shared run of words within this many words of the seam.
+STITCH_WINDOW_WORDS = 40
+MIN_STITCH_WORDS = 2
+
+MAX_ATTEMPTS = int(os.getenv("TRANSCRIPTION_MAX_ATTEMPTS", "6"))
+BACKOFF_BASE_SECONDS = float(os.getenv("TRANSCRIPTION_BACKOFF_BASE_SECONDS", "10"))
+BACKOFF_MAX_SECONDS = float(os.getenv("TRANSCRIPTION_BACKOFF_MAX_SECONDS", "3600"))
+POLL_SECONDS = float(os.getenv("TRANSCRIPTION_POLL_SECONDS", "2"))
+# A running job whose worker died is handed out again after this long.
+LEASE = timedelta(minutes=10)
+
+
+class WhisperBackend:
+    def transcribe(self, audio_path: str, start: float, end: Optional[float]) -> str:
+        """Transcribe audio using OpenAI Whisper API."""
+        with open(audio_path, "rb") as audio_file:
+            return clients.openai.audio.transcriptions.create(
+                model="whisper-1",
+                file=audio_file,
+                response_format="text"
+            )
+
+
+class FakeBackend:
+    def transcribe(self, audio_path: str, start: float, end: Optional[float]) -> str:
+        if FAKE_DELAY_SECONDS:
+            time.sleep(FAKE_DELAY_SECONDS)
+        if end is None:
+            return f"(fake transcript of {os.path.basename(audio_path)})"
+        return " ".join(f"s{second}" for second in range(math.ceil(start), math.ceil(end)))
+
+
+def get_backend() -> WhisperBackend | FakeBackend:
+    if TRANSCRIPTION_BACKEND == "fake":
+        return FakeBackend()
+    return WhisperBackend()
+
+
+def enabled() -> bool:
+    return TRANSCRIPTION_BACKEND == "fake" or bool(OPENAI_API_KEY)
+
+
+def can_chunk() -> bool:
+    return bool(shutil.which(FFMPEG_BIN) and shutil.which(FFPROBE_BIN))
+
+
+def probe_duration(audio_path: str) -> float:
+    result = subprocess.run(
+        [FFPROBE_BIN, "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+        capture_output=True, text=True, check=True,
+    )
+    return float(result.stdout.strip())
+
+
+def plan_chunks(duration: float) -> list[tuple[float, float]]:
+    """(start, end) seconds of each chunk. Chunks start CHUNK_SECONDS apart and run
+    OVERLAP_SECONDS into the next one."""
+    if duration <= CHUNK_SECONDS + OVERLAP_SECONDS:
+        return [(0.0, duration)]
+    chunks = []
+    start = 0.0
+    while True:
+        end = min(start + CHUNK_SECONDS + OVERLAP_SECONDS, duration)
+        chunks.append((start, end))
+        if end >= duration:
+            return chunks
+        start += CHUNK_SECONDS
+
+
+def extract_chunk(audio_path: str, start: float, end: float, out_path: str) -> None:
+    """Cut [start, end) to 16 kHz mono WAV: what Whisper resamples to anyway, and
+    about 2 MB a minute, far under its upload limit."""
+    subprocess.run(
+        [FFMPEG_BIN, "-v", "error", "-y", "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}",
+         "-i", audio_path, "-vn", "-ac", "1", "-ar", "16000", out_path],
+        capture_output=True, check=True,
+    )
+
+
+def _norm(word: str) -> str:
+    return "".join(c for c in word.lower() if c.isalnum())
+
+
+def stitch(left: str, right: str) -> str:
+    """Join the transcripts of two chunks whose audio overlapped, keeping the words
+    they share once. The shared words are the longest common run between the end of
+    `left` and the start of `right`; it needn't sit exactly at either edge, since
+    words cut by the seam come out garbled. Without one, the two are just joined."""
+    a, b = left.split(), right.split()
+    tail = [_norm(w) for w in a[-STITCH_WINDOW_WORDS:]]
+    head = [_norm(w) for w in b[:STITCH_WINDOW_WORDS]]
+    best, tail_end, head_end = 0, 0, 0
+    runs = [0] * (len(head) + 1)
+    for i, word in enumerate(tail):
+        prev, runs = runs, [0] * (len(head) + 1)
+        for j, other in enumerate(head):
+            if word and word == other:
+                runs[j + 1] = prev[j] + 1
+                if runs[j + 1] > best:
+                    best, tail_end, head_end = runs[j + 1], i + 1, j + 1
+    if best < MIN_STITCH_WORDS:
+        return " ".join(a + b)
+    return " ".join(a[:len(a) - len(tail) + tail_end] + b[head_end:])
+
+
+def transcribe_audio(
+    audio_path: str,
+    duration: Optional[float] = None,
+    on_progress: Optional[Callable[[str], None]] = None,
+) -> str:
+    """Transcribe a voice note. A note that fits in one chunk, or whose length is
+    unknown but whose file Whisper accepts, goes to the backend whole; a longer
+    one is chunked, and on_progress gets the stitched text each time it grows."""
+    backend = get_backend()
+    fits_upload = os.path.getsize(audio_path) <= MAX_UPLOAD_BYTES
+    chunkable = can_chunk()
+    if fits_upload and (duration is None or not chunkable):
+        return backend.transcribe(audio_path, 0.0, duration)
+    if not chunkable:
+        raise RuntimeError(f"Voice note is over {MAX_UPLOAD_BYTES} bytes and {FFMPEG_BIN} isn't installed to split it")
+    if duration is None or duration > CHUNK_SECONDS + OVERLAP_SECONDS:
+        duration = probe_duration(audio_path)
+    chunks = plan_chunks(duration)
+    if len(chunks) == 1:
+        return backend.transcribe(audio_path, 0.0, duration)
+
+    with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        def run_chunk(index: int, start: float, end: float) -> str:
+            path = os.path.join(tmp, f"{index}.wav")
+            extract_chunk(audio_path, start, end, path)
+            return backend.transcribe(path, start, end)
+
+        futures = {pool.submit(run_chunk, i, start, end): i for i, (start, end) in enumerate(chunks)}
+        finished: dict[int, str] = {}
+        text, stitched_through = "", 0
+        try:
+            for future in as_completed(futures):
+                finished[futures[future]] = future.result()
+                if stitched_through not in finished:
+                    continue
+                while stitched_through in finished:
+                    text = stitch(text, finished.pop(stitched_through))
+                    stitched_through += 1
+                if on_progress and stitched_through < len(chunks):
+                    on_progress(text)
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+    logger.info("Transcribed %.0fs of audio in %d chunks", duration, len(chunks))
+    return text
+
+
+def enqueue(session, checkin: Checkin) -> None:
+    """Queue a checkin's voice note. Works with sync or async sessions; the caller
+    commits, so the job lands in the same transaction as the checkin."""
+    checkin.transcription_status = "pending"
+    session.add(checkin)
+    session.add(TranscriptionJob(checkin_id=checkin.id))
+
+
+def backoff(attempts: int) -> timedelta:
+    """Exponential backoff with full jitter."""
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return timedelta(seconds=random.uniform(ceiling / 2, ceiling))
+
+
+def claim_job(session: Session) -> Optional[TranscriptionJob]:
+    now = datetime.now(timezone.utc)
+    job = session.exec(
+        select(TranscriptionJob)
+        .where(or_(
+            and_(TranscriptionJob.status == "pending", TranscriptionJob.next_attempt_at <= now),
+            and_(TranscriptionJob.status == "running", TranscriptionJob.locked_at < now - LEASE),
+        ))
+        .order_by(TranscriptionJob.next_attempt_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).first()
+    if not job:
+        return None
+    job.status = "running"
+    job.locked_at = now
+    job.attempts += 1
+    session.add(job)
+    session.commit()
+    return job
+
+
+def run_job(session: Session, job: TranscriptionJob) -> None:
+    checkin = session.get(Checkin, job.checkin_id)
+    if not checkin or not checkin.voice_note_s3_url:
+        # Checkin deleted (the cascade normally takes the job with it) or has no audio.
+        session.delete(job)
+        session.commit()
+        return
+
+    def save_partial(text: str) -> None:
+        checkin.transcription = text
+        checkin.transcription_status = "partial"
+        # Progress renews the lease, so a long note isn't handed to a second worker.
+        job.locked_at = datetime.now(timezone.utc)
+        session.add(checkin)
+        session.add(job)
+        session.commit()
+
+    try:
+        storage = get_storage()
+        key = storage.key(checkin.voice_note_s3_url)
+        suffix = os.path.splitext(key)[1] or ".m4a"
+        with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+            storage.download_fileobj(key, f)
+            f.flush()
+            transcription = transcribe_audio(
+                f.name, checkin.voice_note_duration_seconds, on_progress=save_partial,
+            )
+    except Exception as e:
+        logger.exception("Transcription failed: job=%s checkin=%s attempt=%s", job.id, checkin.id, job.attempts)
+        job.last_error = str(e)[-2000:]
+        job.locked_at = None
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = "failed"
+            checkin.transcription_status = "failed"
+            session.add(checkin)
+        else:
+            job.status = "pending"
+            job.next_attempt_at = datetime.now(timezone.utc) + backoff(job.attempts)
+        session.add(job)
+        session.commit()
+        return
+
+    checkin.transcription = transcription
+    checkin.transcription_status = "completed"
+    job.status = "completed"
+    job.last_error = None
+    job.locked_at = None
+    session.add(checkin)
+    session.add(job)
+    session.commit()
+
+
+def run_once() -> bool:
+    """Claim and run one due job. Returns False if the queue was empty."""
+    with Session(engine) as session:
+        job = claim_job(session)
+        if not job:
+            return False
+        run_job(session, job)
+        return True
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logger.info("Transcription worker started (poll=%ss, max_attempts=%s)", POLL_SECONDS, MAX_ATTEMPTS)
+    if not can_chunk():
+        logger.warning("%s/%s not found: notes will be sent whole, and ones over %d bytes will fail",
+                       FFMPEG_BIN, FFPROBE_BIN, MAX_UPLOAD_BYTES)
+    while True:
+        try:
+            if run_once():
+                continue
+        except Exception:
+            logger.exception("Transcription worker loop error")
+        time.sleep(POLL_SECONDS)
+
+
+if __name__ == "__main__":
+    main()
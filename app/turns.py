@@ -0,0 +1,181 @@
+"""Resumable event streams for morning agent turns.
+
+A turn runs as its own task, decoupled from the HTTP response that started it:
+every event it emits gets a sequence number and goes into a per-turn buffer that
+any number of clients can read from a given point. A dropped connection just
+reconnects with Last-Event-ID and gets what it missed, then the live tail; the
+model turn never restarts.
+
+The newest TURN_BUFFER_EVENTS events stay in memory. Older ones spill to the
+morning_turn_events table in batches, and a finished turn is flushed there
+entirely, so replay works past the ring buffer, after the turn leaves memory,
+and across a restart (up to the point the process died). A running turn with no
+client attached for RESUME_GRACE seconds is cancelled, which stops its tools.
+
+Live tailing needs the turn's own process; the app runs a single uvicorn worker.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID, uuid4
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from app.db import async_session_maker
+from app.models import MorningTurnEvent
+
+logger = logging.getLogger(__name__)
+
+TURN_BUFFER_EVENTS = int(os.getenv("TURN_BUFFER_EVENTS", "1000"))
+SPILL_BATCH = 200
+RESUME_GRACE = 120
+# How long a finished turn stays in memory for fast replay; the table keeps it longer.
+RETAIN_FINISHED = 10 * 60
+EVENT_RETENTION = timedelta(days=1)
+
+_turns: dict[UUID, "TurnStream"] = {}
+
+
+class TurnStream:
+    def __init__(self, session_id: UUID):
+        self.id = uuid4()
+        self.session_id = session_id
+        self.seq = 0
+        self.done = False
+        self._buffer: deque[tuple[int, dict]] = deque()
+        # Evicted from the buffer but not yet written to the table.
+        self._unspilled: list[tuple[int, dict]] = []
+        self._spilled_through = 0
+        self._changed = asyncio.Condition()
+        self._subscribers = 0
+        self._detached_at = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+
+    async def publish(self, event: dict) -> None:
+        self.seq += 1
+        self._buffer.append((self.seq, event))
+        if len(self._buffer) > TURN_BUFFER_EVENTS:
+            self._unspilled.append(self._buffer.popleft())
+            if len(self._unspilled) >= SPILL_BATCH:
+                await self._spill(self._unspilled)
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _spill(self, events: list[tuple[int, dict]]) -> None:
+        """Write events to the table, then mark them readable from there. Only the
+        turn's own task spills, so spills never overlap."""
+        events = [(seq, event) for seq, event in events if seq > self._spilled_through]
+        if not events:
+            return
+        async with async_session_maker() as session:
+            session.add_all([
+                MorningTurnEvent(turn_id=self.id, seq=seq, session_id=self.session_id, event=event)
+                for seq, event in events
+            ])
+            await session.commit()
+        self._spilled_through = events[-1][0]
+        self._unspilled = [(seq, event) for seq, event in self._unspilled if seq > self._spilled_through]
+
+    async def _run(self, events: AsyncIterator[dict]) -> None:
+        try:
+            async for event in events:
+                await self.publish(event)
+        except asyncio.CancelledError:
+            await self.publish({"type": "error", "message": "Turn cancelled: no client reconnected"})
+        except Exception:
+            logger.exception("Morning turn %s failed", self.id)
+            await self.publish({"type": "error", "message": "The turn failed"})
+        finally:
+            self.done = True
+            try:
+                await self._spill(self._unspilled + list(self._buffer))
+                await _purge_expired()
+            except Exception:
+                logger.exception("Could not persist events for turn %s", self.id)
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def _watch(self) -> None:
+        """Cancel the turn once it has been unattended for RESUME_GRACE, then drop
+        it from memory RETAIN_FINISHED after it ends."""
+        while not self.done:
+            await asyncio.sleep(RESUME_GRACE / 4)
+            if not self.done and self._subscribers == 0 \
+                    and time.monotonic() - self._detached_at > RESUME_GRACE:
+                logger.info("Cancelling abandoned morning turn %s", self.id)
+                self._task.cancel()
+                break
+        await self._task
+        await asyncio.sleep(RETAIN_FINISHED)
+        _turns.pop(self.id, None)
+
+    async def events_after(self, after: int) -> AsyncIterator[tuple[int, dict]]:
+        """(seq, event) for every event numbered above `after`, then live events
+        until the turn ends."""
+        self._subscribers += 1
+        try:
+            while True:
+                # Snapshot before any await: together these cover every event.
+                spilled_through = self._spilled_through
+                in_memory = self._unspilled + list(self._buffer)
+                if after < spilled_through:
+                    for seq, event in await load_events(self.id, after, spilled_through):
+                        yield seq, event
+                        after = seq
+                for seq, event in in_memory:
+                    if seq > after:
+                        yield seq, event
+                        after = seq
+                if self.done and after >= self.seq:
+                    return
+                async with self._changed:
+                    if after >= self.seq and not self.done:
+                        await self._changed.wait()
+        finally:
+            self._subscribers -= 1
+            self._detached_at = time.monotonic()
+
+
+def start(session_id: UUID, events: AsyncIterator[dict]) -> TurnStream:
+    """Run a turn's event iterator in the background and return its stream."""
+    turn = TurnStream(session_id)
+    _turns[turn.id] = turn
+    turn._task = asyncio.create_task(turn._run(events))
+    turn._watcher = asyncio.create_task(turn._watch())
+    return turn
+
+
+def get(turn_id: UUID) -> Optional[TurnStream]:
+    return _turns.get(turn_id)
+
+
+async def load_events(turn_id: UUID, after: int, through: Optional[int] = None) -> list[tuple[int, dict]]:
+    async with async_session_maker() as session:
+        query = select(MorningTurnEvent.seq, MorningTurnEvent.event).where(
+            MorningTurnEvent.turn_id == turn_id, MorningTurnEvent.seq > after,
+        )
+        if through is not None:
+            query = query.where(MorningTurnEvent.seq <= through)
+        return [tuple(row) for row in (await session.exec(query.order_by(MorningTurnEvent.seq))).all()]
+
+
+async def stored_session_id(turn_id: UUID) -> Optional[UUID]:
+    """The session a turn belongs to, if any of its events reached the table."""
+    async with async_session_maker() as session:
+        return (await session.exec(
+            select(MorningTurnEvent.session_id).where(MorningTurnEvent.turn_id == turn_id).limit(1)
+        )).first()
+
+
+async def _purge_expired() -> None:
+    async with async_session_maker() as session:
+        await session.exec(delete(MorningTurnEvent).where(
+            MorningTurnEvent.created_at < datetime.now(timezone.utc) - EVENT_RETENTION,
+        ))
+        await session.commit()
@@ -0,0 +1,53 @@
+"""Rebuild daily_practice_stats from sits and checkins.
+
+Safe to re-run at any time: the rebuild happens in one transaction holding an
+EXCLUSIVE lock on the rollup, so requests that log or delete a sit meanwhile
+wait, then apply their change on top of the rebuilt totals.
+
+Run after the add_daily_practice_stats migration:
+  cd /opt/sit && source .venv/bin/activate && python scripts/backfill_daily_practice_stats.py
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.db import engine
+from app.practice_stats import DEFAULT_TIMEZONE
+
+# Mirrors app/practice_stats.py: local date in the row's own timezone (the default
+# when it isn't a zone name), minutes rounded half up per sit.
+REBUILD = """
+    WITH zones AS (SELECT name FROM pg_timezone_names)
+    INSERT INTO daily_practice_stats (user_id, local_date, sit_minutes, sit_count, checkin_count, updated_at)
+    SELECT user_id, local_date, sum(minutes), sum(sits), sum(checkins), now()
+    FROM (
+        SELECT user_id,
+               (started_at AT TIME ZONE coalesce((SELECT name FROM zones WHERE name = timezone), :default_tz))::date
+                   AS local_date,
+               floor(duration_seconds / 60 + 0.5)::int AS minutes, 1 AS sits, 0 AS checkins
+        FROM sits
+        UNION ALL
+        SELECT user_id,
+               (responded_at AT TIME ZONE coalesce((SELECT name FROM zones WHERE name = timezone), :default_tz))::date,
+               0, 0, 1
+        FROM checkins
+    ) rows
+    GROUP BY user_id, local_date
+"""
+
+
+def main():
+    with engine.begin() as conn:
+        conn.execute(text("LOCK TABLE daily_practice_stats IN EXCLUSIVE MODE"))
+        conn.execute(text("DELETE FROM daily_practice_stats"))
+        conn.execute(text(REBUILD), {"default_tz": DEFAULT_TIMEZONE})
+        days, users = conn.execute(text(
+            "SELECT count(*), count(DISTINCT user_id) FROM daily_practice_stats"
+        )).one()
+    print(f"Rebuilt {days} daily rows for {users} users.")
+
+
+if __name__ == "__main__":
+    main()
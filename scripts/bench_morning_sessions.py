@@ -0,0 +1,101 @@
+"""Benchmark: the morning dashboard's session listing, per-session counts vs one page query.
+
+Builds throwaway morning_sessions/morning_messages tables in a scratch schema (never
+touches the real ones), then for each session count in SIZES times:
+  before — every session, then one SELECT of message ids per session (len() in Python)
+  after  — the newest page by keyset, one GROUP BY count for that page, one total count
+The "after" column should stay flat as the history grows.
+
+Run (needs a Postgres you can create a schema in):
+  cd /opt/sit && source .venv/bin/activate && python scripts/bench_morning_sessions.py
+  BENCH_SIZES=1000,10000 BENCH_MESSAGES=20 python scripts/bench_morning_sessions.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.db import engine
+
+SCHEMA = "bench_morning_sessions"
+SIZES = [int(n) for n in os.getenv("BENCH_SIZES", "100,1000,5000").split(",")]
+MESSAGES_PER_SESSION = int(os.getenv("BENCH_MESSAGES", "12"))
+PAGE = 50
+RUNS = 5
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+def seed(conn, sessions: int) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.morning_sessions AS
+        SELECT gen_random_uuid() AS id, CAST(:user_id AS uuid) AS user_id,
+               now() - (i * interval '1 day') AS created_at
+        FROM generate_series(1, :sessions) i
+    """), {"user_id": USER_ID, "sessions": sessions})
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.morning_messages AS
+        SELECT gen_random_uuid() AS id, s.id AS session_id,
+               s.created_at + (j * interval '1 minute') AS created_at
+        FROM {SCHEMA}.morning_sessions s, generate_series(1, :messages) j
+    """), {"messages": MESSAGES_PER_SESSION})
+    conn.execute(text(f"ALTER TABLE {SCHEMA}.morning_sessions ADD PRIMARY KEY (id)"))
+    conn.execute(text(
+        f"CREATE INDEX ON {SCHEMA}.morning_sessions (user_id, created_at)"))
+    conn.execute(text(
+        f"CREATE INDEX ON {SCHEMA}.morning_messages (session_id, created_at)"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.morning_sessions"))
+    conn.execute(text(f"ANALYZE {SCHEMA}.morning_messages"))
+
+
+def list_before(conn) -> None:
+    ids = conn.execute(text(f"""
+        SELECT id FROM {SCHEMA}.morning_sessions WHERE user_id = :user_id ORDER BY created_at
+    """), {"user_id": USER_ID}).scalars().all()
+    for session_id in ids:
+        len(conn.execute(text(f"""
+            SELECT id FROM {SCHEMA}.morning_messages WHERE session_id = :session_id
+        """), {"session_id": session_id}).all())
+
+
+def list_after(conn) -> None:
+    page = conn.execute(text(f"""
+        SELECT id FROM {SCHEMA}.morning_sessions WHERE user_id = :user_id
+        ORDER BY created_at DESC, id DESC LIMIT :limit
+    """), {"user_id": USER_ID, "limit": PAGE + 1}).scalars().all()[:PAGE]
+    conn.execute(text(f"""
+        SELECT session_id, count(*) FROM {SCHEMA}.morning_messages
+        WHERE session_id = ANY(CAST(:ids AS uuid[])) GROUP BY session_id
+    """), {"ids": [str(i) for i in page]}).all()
+    conn.execute(text(f"""
+        SELECT count(*) FROM {SCHEMA}.morning_sessions WHERE user_id = :user_id
+    """), {"user_id": USER_ID}).scalar()
+
+
+def median_ms(conn, fn) -> float:
+    timings = []
+    for _ in range(RUNS):
+        t0 = time.perf_counter()
+        fn(conn)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return sorted(timings)[RUNS // 2]
+
+
+def main():
+    print(f"{'sessions':>10}  {'before (ms)':>12}  {'after (ms)':>11}")
+    for size in SIZES:
+        with engine.begin() as conn:
+            seed(conn, size)
+        with engine.begin() as conn:
+            before = median_ms(conn, list_before)
+            after = median_ms(conn, list_after)
+        print(f"{size:>10,}  {before:>12.2f}  {after:>11.2f}")
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark: time-window queries with and without the composite (user_id, time) indexes.
+
+Builds throwaway copies of sits/checkins in a scratch schema (never touches the real
+tables), seeds them with ROWS rows each spread over USERS users and ~5 years, then
+EXPLAIN ANALYZEs the app's range queries — a calendar month of sits (list_sits), a
+local day (toggle_sit / add_sit), and a year of checkins (query_practice_data) —
+first with only the single-column user_id index, then with the composite index.
+
+Run (needs a Postgres you can create a schema in):
+  cd /opt/sit && source .venv/bin/activate && python scripts/bench_time_range_indexes.py
+  BENCH_ROWS=5000000 python scripts/bench_time_range_indexes.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.db import engine
+
+SCHEMA = "bench_time_range_indexes"
+ROWS = int(os.getenv("BENCH_ROWS", "1000000"))
+USERS = int(os.getenv("BENCH_USERS", "200"))
+RUNS = 5
+
+QUERIES = {
+    "sits: one month (list_sits)": """
+        SELECT * FROM {schema}.sits
+        WHERE user_id = :user_id AND started_at >= :start AND started_at < :start + interval '1 month'
+    """,
+    "sits: one day (toggle_sit/add_sit)": """
+        SELECT * FROM {schema}.sits
+        WHERE user_id = :user_id AND started_at >= :start AND started_at < :start + interval '1 day'
+    """,
+    "checkins: one year, newest first (query_practice_data)": """
+        SELECT * FROM {schema}.checkins
+        WHERE user_id = :user_id AND responded_at >= :start AND responded_at <= :start + interval '1 year'
+        ORDER BY responded_at DESC
+    """,
+}
+
+
+def seed(conn) -> None:
+    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    # Fixed user ids, so the benchmark user is the same across runs.
+    conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.users AS
+        SELECT md5(i::text)::uuid AS id FROM generate_series(1, :users) i
+    """), {"users": USERS})
+    for table, ts in (("sits", "started_at"), ("checkins", "responded_at")):
+        conn.execute(text(f"""
+            CREATE TABLE {SCHEMA}.{table} AS
+            SELECT gen_random_uuid() AS id,
+                   md5(((i % :users) + 1)::text)::uuid AS user_id,
+                   now() - (random() * interval '5 years') AS {ts},
+                   1800.0 AS duration_seconds,
+                   now() AS created_at
+            FROM generate_series(1, :rows) i
+        """), {"users": USERS, "rows": ROWS})
+        conn.execute(text(f"CREATE INDEX ix_{table}_user_id ON {SCHEMA}.{table} (user_id)"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.{table}"))
+
+
+def plan_summary(plan: dict) -> str:
+    nodes = []
+
+    def walk(node):
+        label = node["Node Type"]
+        if "Index Name" in node:
+            label += f" using {node['Index Name']}"
+        nodes.append(label)
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan)
+    return " -> ".join(nodes)
+
+
+def run_queries(conn, label: str) -> None:
+    user_id = conn.execute(text(f"SELECT id FROM {SCHEMA}.users LIMIT 1")).scalar()
+    start = conn.execute(text("SELECT date_trunc('month', now() - interval '1 year')")).scalar()
+    print(f"\n== {label}")
+    for name, sql in QUERIES.items():
+        sql = sql.format(schema=SCHEMA)
+        params = {"user_id": user_id, "start": start}
+        timings = []
+        for _ in range(RUNS):
+            t0 = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - t0) * 1000)
+        explain = conn.execute(text("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql), params).scalar()
+        plan = (json.loads(explain) if isinstance(explain, str) else explain)[0]
+        buffers = plan["Plan"].get("Shared Hit Blocks", 0) + plan["Plan"].get("Shared Read Blocks", 0)
+        print(f"  {name}")
+        print(f"    plan:    {plan_summary(plan['Plan'])}")
+        print(f"    median:  {sorted(timings)[RUNS // 2]:.2f} ms   buffers: {buffers}")
+
+
+def main():
+    print(f"Seeding {ROWS:,} sits and {ROWS:,} checkins across {USERS} users…")
+    with engine.begin() as conn:
+        seed(conn)
+    with engine.begin() as conn:
+        run_queries(conn, "single-column user_id indexes (before)")
+        conn.execute(text(f"CREATE INDEX ix_sits_user_id_started_at ON {SCHEMA}.sits (user_id, started_at)"))
+        conn.execute(text(f"CREATE INDEX ix_checkins_user_id_responded_at ON {SCHEMA}.checkins (user_id, responded_at)"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.sits"))
+        conn.execute(text(f"ANALYZE {SCHEMA}.checkins"))
+        run_queries(conn, "composite (user_id, time) indexes (after)")
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
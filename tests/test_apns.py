@@ -0,0 +1,123 @@
+"""APNsClient against an in-process fake APNs (an httpx.MockTransport)."""
+import asyncio
+import json
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from app.apns import APNsClient, APNsError
+
+
+class FakeAPNs:
+    """Answers like APNs: 200 with an apns-id, or an error status and reason for
+    tokens registered in `errors`. Tracks the bearer tokens and peak concurrency."""
+
+    def __init__(self, errors: dict[str, tuple[int, str]] = None, delay: float = 0.01):
+        self.errors = errors or {}
+        self.delay = delay
+        self.bearers: list[str] = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.bearers.append(request.headers["authorization"].removeprefix("bearer "))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        token = request.url.path.rsplit("/", 1)[-1]
+        if token in self.errors:
+            status, reason = self.errors[token]
+            return httpx.Response(status, json={"reason": reason})
+        assert json.loads(request.content)["aps"]["alert"]["title"] == "Check In"
+        return httpx.Response(200, headers={"apns-id": "fake"})
+
+
+def make_client(tmp_path, fake: FakeAPNs, max_concurrency: int = 50) -> tuple[APNsClient, ec.EllipticCurvePrivateKey]:
+    key = ec.generate_private_key(ec.SECP256R1())
+    key_path = tmp_path / "AuthKey_TEST.p8"
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption(),
+    ))
+    client = APNsClient(
+        key_id="TESTKEY123", team_id="TESTTEAM12", auth_key_path=str(key_path),
+        host="https://apns.test", max_concurrency=max_concurrency,
+        transport=httpx.MockTransport(fake),
+    )
+    return client, key
+
+
+def test_provider_jwt_signed_once_and_reused(tmp_path):
+    fake = FakeAPNs()
+    client, key = make_client(tmp_path, fake)
+
+    async def run():
+        await client.send_many([f"token{i}" for i in range(20)], "Check In", "body")
+        await client.send("token-last", "Check In", "body")
+        await client.aclose()
+
+    asyncio.run(run())
+    assert len(fake.bearers) == 21
+    assert len(set(fake.bearers)) == 1
+    claims = jwt.decode(fake.bearers[0], key.public_key(), algorithms=["ES256"])
+    assert claims["iss"] == "TESTTEAM12"
+    assert jwt.get_unverified_header(fake.bearers[0])["kid"] == "TESTKEY123"
+
+
+def test_fan_out_is_concurrent_but_bounded(tmp_path):
+    fake = FakeAPNs(delay=0.02)
+    client, _ = make_client(tmp_path, fake, max_concurrency=5)
+
+    async def run():
+        results = await client.send_many([f"token{i}" for i in range(40)], "Check In", "body")
+        await client.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert results == [None] * 40
+    assert fake.peak == 5
+
+
+def test_dead_and_rejected_tokens_reported_per_token(tmp_path):
+    fake = FakeAPNs(errors={
+        "gone": (410, "Unregistered"),
+        "bad": (400, "BadDeviceToken"),
+        "busy": (429, "TooManyRequests"),
+    })
+    client, _ = make_client(tmp_path, fake)
+
+    async def run():
+        results = await client.send_many(["ok", "gone", "bad", "busy"], "Check In", "body")
+        await client.aclose()
+        return results
+
+    ok, gone, bad, busy = asyncio.run(run())
+    assert ok is None
+    assert isinstance(gone, APNsError) and gone.status_code == 410 and gone.dead_token
+    assert isinstance(bad, APNsError) and bad.reason == "BadDeviceToken" and bad.dead_token
+    assert isinstance(busy, APNsError) and not busy.dead_token and not busy.token_failure
+
+
+def test_expired_provider_token_is_resigned_once(tmp_path):
+    fake = FakeAPNs()
+    client, _ = make_client(tmp_path, fake)
+    calls = []
+
+    async def expire_first(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(403, json={"reason": "ExpiredProviderToken"})
+        return await fake(request)
+
+    client.transport = httpx.MockTransport(expire_first)
+
+    async def run():
+        await client.send("token", "Check In", "body")
+        await client.aclose()
+
+    asyncio.run(run())
+    assert len(calls) == 2